@@ -0,0 +1,131 @@
+"""
+Pluggable speech recognition engines for the audio monitor
+Both engines take 16 kHz mono float32 audio and expose transcribe(audio)
+and transcribe_batch(audios). Batches of utterances (up to 30 s each, e.g.
+from several microphones) are decoded in one model call.
+
+  whisper         openai-whisper (PyTorch), batched through whisper.decode
+  faster-whisper  CTranslate2 int8 engine, batched through generate()
+
+Each engine imports its own library, so only the one in use must be installed.
+"""
+import numpy as np
+
+WHISPER_SAMPLES = 30 * 16000  # Whisper's fixed 30 s input window
+
+class WhisperEngine:
+    """openai-whisper"""
+
+    def __init__(self, model_size="base", device=None, threads=None, beam_size=None,
+                 temperature=0.0, initial_prompt=None):
+        import torch
+        import whisper
+        self.torch = torch
+        self.whisper = whisper
+        if threads:
+            torch.set_num_threads(threads)
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = whisper.load_model(model_size, device=self.device)
+        self.beam_size = beam_size
+        self.temperature = temperature
+        self.initial_prompt = initial_prompt
+
+    def transcribe(self, audio):
+        result = self.model.transcribe(
+            audio,
+            language="en",
+            verbose=False,
+            temperature=self.temperature,
+            beam_size=self.beam_size,
+            condition_on_previous_text=False,
+            initial_prompt=self.initial_prompt,
+            fp16=self.device == "cuda",
+        )
+        return result["text"]
+
+    def transcribe_batch(self, audios):
+        """One batched decode for utterances that fit the 30 s window"""
+        if len(audios) == 1 or any(len(audio) > WHISPER_SAMPLES for audio in audios):
+            return [self.transcribe(audio) for audio in audios]
+        mel = self.torch.stack([
+            self.whisper.log_mel_spectrogram(self.whisper.pad_or_trim(audio), n_mels=self.model.dims.n_mels)
+            for audio in audios
+        ]).to(self.device)
+        options = self.whisper.DecodingOptions(
+            language="en",
+            without_timestamps=True,
+            temperature=self.temperature,
+            beam_size=self.beam_size,
+            prompt=self.initial_prompt,
+            fp16=self.device == "cuda",
+        )
+        return [result.text for result in self.whisper.decode(self.model, mel, options)]
+
+class FasterWhisperEngine:
+    """faster-whisper / CTranslate2, int8 on CPU by default"""
+
+    def __init__(self, model_size="base", device="cpu", threads=None, beam_size=None,
+                 temperature=0.0, initial_prompt=None, compute_type="int8"):
+        import ctranslate2
+        from faster_whisper import WhisperModel
+        from faster_whisper.tokenizer import Tokenizer
+        self.ctranslate2 = ctranslate2
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type,
+                                  cpu_threads=threads or 0)
+        self.tokenizer = Tokenizer(self.model.hf_tokenizer, self.model.model.is_multilingual,
+                                   task="transcribe", language="en")
+        self.beam_size = beam_size or 1
+        self.temperature = temperature
+        self.initial_prompt = initial_prompt
+
+    def transcribe(self, audio):
+        segments, _ = self.model.transcribe(
+            audio,
+            language="en",
+            beam_size=self.beam_size,
+            temperature=self.temperature,
+            condition_on_previous_text=False,
+            initial_prompt=self.initial_prompt,
+            without_timestamps=True,
+        )
+        return "".join(segment.text for segment in segments)
+
+    def _prompt(self):
+        """Decoder prompt: optional previous-text prompt, then <|startoftranscript|><|en|><|transcribe|><|notimestamps|>"""
+        tokens = []
+        if self.initial_prompt:
+            tokens = [self.tokenizer.sot_prev] + self.tokenizer.encode(" " + self.initial_prompt.strip())
+        return tokens + list(self.tokenizer.sot_sequence) + [self.tokenizer.no_timestamps]
+
+    def transcribe_batch(self, audios):
+        """One CTranslate2 generate() call for utterances that fit the 30 s window"""
+        if len(audios) == 1 or any(len(audio) > WHISPER_SAMPLES for audio in audios):
+            return [self.transcribe(audio) for audio in audios]
+        extractor = self.model.feature_extractor
+        features = np.stack([
+            extractor(np.pad(audio, (0, WHISPER_SAMPLES - len(audio))))[:, :extractor.nb_max_frames]
+            for audio in audios
+        ]).astype(np.float32)
+        encoder_input = self.ctranslate2.StorageView.from_array(np.ascontiguousarray(features))
+        results = self.model.model.generate(
+            encoder_input,
+            [self._prompt()] * len(audios),
+            beam_size=self.beam_size,
+            sampling_temperature=self.temperature or 1.0,
+            sampling_topk=0 if self.temperature else 1,
+            max_length=448,
+            suppress_blank=True,
+        )
+        return [self.tokenizer.decode([t for t in result.sequences_ids[0] if t < self.tokenizer.eot])
+                for result in results]
+
+ENGINES = {
+    "whisper": WhisperEngine,
+    "faster-whisper": FasterWhisperEngine,
+}
+
+def make_engine(name, **options):
+    """Build an engine by name ('whisper' or 'faster-whisper')"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown ASR engine: {name} (expected one of {', '.join(ENGINES)})")
+    return ENGINES[name](**options)
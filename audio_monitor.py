@@ -1,16 +1,24 @@
-import whisper
 import sounddevice as sd
 import numpy as np
-import torch
 import warnings
+import queue
+import threading
+import time
 from datetime import datetime
 from scipy import signal
 import sys
+import os
+
+from audio_stream import StreamingCapture
+from vad_segmenter import VADSegmenter
+from spectral_denoiser import SpectralDenoiser
+from keyword_spotter import KeywordMatcher, KeywordCascade, load_vocabulary
+from asr_engines import make_engine
 warnings.filterwarnings('ignore')
 
 
 sys.path.insert(0, './backend')
-from monitoring_client import get_monitoring_client
+from monitoring_client import MonitoringClient, get_monitoring_client
 
 monitoring_client = get_monitoring_client()
 monitoring_client.start()
@@ -21,19 +29,74 @@ print("✓ Connected to dashboard backend")
 # WHISPER + VOICE ACTIVITY DETECTION + NOISE REDUCTION
 # =========================================================================
 
-# Keywords to detect
-KEYWORDS = ["help", "nurse", "pain", "doctor", "emergency", "breathe", "hurt", "ache"]
+# Keywords to detect: keyword -> whole-word forms that count as that keyword.
+# PAIN_WATCHER_KEYWORDS can point to a JSON file with the same structure.
+KEYWORDS = {
+    "help": ["help", "help me", "helping"],
+    "nurse": ["nurse", "nurses"],
+    "pain": ["pain", "pains", "painful"],
+    "doctor": ["doctor", "doctors"],
+    "emergency": ["emergency"],
+    "breathe": ["breathe", "breath", "breathing"],
+    "hurt": ["hurt", "hurts", "hurting"],
+    "ache": ["ache", "aches", "aching"],
+}
+if os.environ.get("PAIN_WATCHER_KEYWORDS"):
+    KEYWORDS = load_vocabulary(os.environ["PAIN_WATCHER_KEYWORDS"])
+matcher = KeywordMatcher(KEYWORDS)
+
+# Keyword cascade: a small Whisper model screens every utterance and the
+# full model only runs on keyword hits, plus every FULL_TRANSCRIBE_EVERY-th
+# utterance so the transcript history stays readable
+CASCADE = True
+SPOTTER_MODEL = os.environ.get("PAIN_WATCHER_SPOTTER_MODEL", "tiny")
+FULL_MODEL = os.environ.get("PAIN_WATCHER_ASR_MODEL", "base")
+FULL_TRANSCRIBE_EVERY = 5
+
+# Speech recognition engine: "whisper" (openai-whisper) or "faster-whisper"
+# (CTranslate2, int8 weights on CPU). Utterances waiting from all
+# microphones are decoded together in one batch.
+ASR_ENGINE = os.environ.get("PAIN_WATCHER_ASR", "whisper")
+ASR_THREADS = int(os.environ.get("PAIN_WATCHER_ASR_THREADS", "0")) or None  # None = library default
+BEAM_SIZE = int(os.environ.get("PAIN_WATCHER_BEAM_SIZE", "0")) or None  # None = greedy
+COMPUTE_TYPE = "int8"  # faster-whisper weights (e.g. int8, int8_float16, float16)
+MAX_BATCH = 8  # Utterances decoded per call
+BATCH_WAIT = 0.2  # Seconds to wait for more utterances to join a batch
 
 # Audio config
 SAMPLERATE = 16000
 DURATION = 5  # Seconds per recording chunk
 DEVICE_ID = 2  # Microphone Array
 
+# Microphones, one per bed: PAIN_WATCHER_MICS="2:bed-1,3:bed-2" (device:bed).
+# Without it, DEVICE_ID reports to the bed from PAIN_WATCHER_BED_ID.
+def parse_microphones(spec):
+    """[(device_id, bed_id)] from 'device:bed,device:bed' (bed optional)"""
+    microphones = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        device, _, bed = entry.partition(":")
+        microphones.append((int(device) if device.isdigit() else device, bed or None))
+    return microphones
+
+MICROPHONES = parse_microphones(os.environ.get("PAIN_WATCHER_MICS", "")) or [(DEVICE_ID, None)]
+
+# Streaming capture: the microphone records continuously into a ring buffer
+# while speech is transcribed, and a streaming VAD cuts it into utterances
+# (10 ms frames, adaptive noise floor), so Whisper only runs on speech spans
+STREAMING = True
+RING_SECONDS = 60  # Audio kept for a slow transcriber before it is overwritten
+BLOCK_SECONDS = 0.1  # Audio handed to the VAD per step
+MAX_UTTERANCE = 15.0  # Longer speech is cut into several utterances
+
 # Voice Activity Detection thresholds
 VAD_THRESHOLD = 0.05  # Minimum RMS level to consider speech
 SPEECH_DURATION_MIN = 0.5  # Minimum speech duration in seconds
 SILENCE_THRESHOLD = 0.02  # Background noise threshold
 
+# Noise reduction: the noise profile is learned from audio the VAD marked as
+# silence (one profile per microphone in streaming mode)
+denoiser = SpectralDenoiser(frame_length=512)
+
 def detect_speech(audio, sr=16000):
     """
     Detect if audio contains meaningful speech using VAD.
@@ -65,34 +128,12 @@ def detect_speech(audio, sr=16000):
     
     return speech_count >= min_speech_frames
 
-def reduce_noise(audio, sr=16000):
+def reduce_noise(audio, sr=16000, denoiser=denoiser):
     """
-    Simple noise reduction using spectral subtraction.
+    Spectral subtraction with a microphone's denoiser: one batched STFT over
+    the whole chunk, against the noise profile learned from VAD silence.
     """
-    # Get noise profile from first 0.5s (assuming silence)
-    noise_sample = audio[:int(0.5 * sr)]
-    noise_spectrum = np.abs(np.fft.rfft(noise_sample))
-    noise_mean = np.mean(noise_spectrum, axis=0)
-    
-    # Process full audio
-    result = np.zeros_like(audio)
-    frame_length = 512
-    hop_length = frame_length // 2
-    
-    for i in range(0, len(audio) - frame_length, hop_length):
-        frame = audio[i:i + frame_length]
-        spectrum = np.abs(np.fft.rfft(frame))
-        
-        # Subtract noise, but keep floor to avoid over-suppression
-        clean_spectrum = np.maximum(spectrum - noise_mean * 0.8, spectrum * 0.1)
-        
-        # Reconstruct phase
-        phase = np.angle(np.fft.rfft(frame))
-        clean_fft = clean_spectrum * np.exp(1j * phase)
-        clean_frame = np.fft.irfft(clean_fft)
-        
-        # Overlap-add
-        result[i:i + frame_length] += clean_frame * np.hanning(frame_length)
+    result = denoiser.denoise(audio)
     
     # Normalize
     return result / (np.max(np.abs(result)) + 1e-8)
@@ -101,16 +142,41 @@ print("=" * 70)
 print("WHISPER + VAD + NOISE REDUCTION AUDIO MONITOR")
 print("=" * 70)
 
-# Load Whisper model (tiny for speed, base for accuracy)
-print("\n📥 Loading Whisper model (base)...")
-model = whisper.load_model("base", device="cuda" if torch.cuda.is_available() else "cpu")
+def load_engine(model_size, temperature, initial_prompt=None):
+    options = dict(model_size=model_size, threads=ASR_THREADS, beam_size=BEAM_SIZE,
+                   temperature=temperature, initial_prompt=initial_prompt)
+    if ASR_ENGINE == "faster-whisper":
+        options["compute_type"] = COMPUTE_TYPE
+    return make_engine(ASR_ENGINE, **options)
+
+# Load Whisper models (tiny for speed, base for accuracy)
+print(f"\n📥 Loading {ASR_ENGINE} model ({FULL_MODEL})...")
+full_engine = load_engine(FULL_MODEL, temperature=0.5)
+cascade = None
+if CASCADE:
+    # Cheap first pass: greedy, primed with the keyword vocabulary
+    print(f"📥 Loading keyword spotter ({SPOTTER_MODEL})...")
+    spot_engine = load_engine(SPOTTER_MODEL, temperature=0.0, initial_prompt=", ".join(matcher.keywords))
+    cascade = KeywordCascade(spot_engine.transcribe_batch, full_engine.transcribe_batch,
+                             matcher, full_every=FULL_TRANSCRIBE_EVERY)
 print("✓ Whisper model loaded!")
 
+def transcribe_batch(audios):
+    """(text, keywords, stage) for each utterance, screened by the spotter in cascade mode"""
+    if cascade is not None:
+        return cascade.process_batch(audios)
+    texts = [text.strip().lower() for text in full_engine.transcribe_batch(audios)]
+    return [(text, matcher.find(text), 2) for text in texts]
+
 print("\n🎤 Audio Configuration:")
-print(f"  Device ID: {DEVICE_ID} (Microphone Array)")
+for device, bed in MICROPHONES:
+    print(f"  Device ID: {device}" + (f" -> {bed}" if bed else ""))
 print(f"  Sample Rate: {SAMPLERATE} Hz")
-print(f"  Recording Duration: {DURATION}s per chunk")
-print(f"  Keywords: {KEYWORDS}")
+print("  Recording: " + ("streaming, VAD utterances" if STREAMING else f"{DURATION}s per chunk"))
+print(f"  Keywords: {matcher.keywords}")
+print(f"  ASR: {ASR_ENGINE}" + (f" ({COMPUTE_TYPE})" if ASR_ENGINE == "faster-whisper" else "")
+      + f", beam {BEAM_SIZE or 'greedy'}, threads {ASR_THREADS or 'default'}, batch {MAX_BATCH}")
+print("  Keyword Cascade: " + (f"{SPOTTER_MODEL} screen, {FULL_MODEL} on hits" if CASCADE else "off"))
 print(f"  Speech Detection: VAD + Noise Reduction")
 print(f"  Min Speech Duration: {SPEECH_DURATION_MIN}s")
 
@@ -119,73 +185,154 @@ print("Listening for distress keywords... Speak clearly!")
 print("Press Ctrl+C to stop.")
 print("=" * 70 + "\n")
 
+def report(client, text, detected_keywords, stage, label=""):
+    """Print and send one transcription result"""
+    if text and len(text) > 3:  # Only show results with meaningful text (>3 chars)
+        print(f"✓\n  {label}Heard{'' if stage == 2 else ' (spotter)'}: '{text}'")
+        
+        # Send to backend
+        client.send_audio_data(
+            text=text,
+            keywords=detected_keywords
+        )
+        
+        if detected_keywords:
+            print("\n" + "!" * 70)
+            print(f"🚨 CRITICAL AUDIO ALERT: {label}{detected_keywords} detected!")
+            print(f"   Transcription: '{text}'")
+            print(f"   Timestamp: {datetime.now().isoformat()}")
+            print("!" * 70)
+        else:
+            print("   >> (No critical keywords detected)")
+    else:
+        print("(no meaningful speech)")
+
+def process_chunk(audio):
+    """VAD, denoise, transcribe and report one blocking recording"""
+    # Step 1: Check if there's actual speech (VAD)
+    if not detect_speech(audio, SAMPLERATE):
+        print("(silence - no speech detected)")
+        denoiser.update_noise(audio)
+        return
+    
+    # Step 2: Reduce noise and normalize
+    print("\n  Denoising...", end=" ", flush=True)
+    audio_clean = reduce_noise(audio, SAMPLERATE)
+    
+    print("Transcribing...", end=" ", flush=True)
+    text, detected_keywords, stage = transcribe_batch([audio_clean])[0]
+    report(monitoring_client, text, detected_keywords, stage)
+
+class Microphone:
+    """
+    One streaming microphone: ring-buffer capture, VAD and noise profile of
+    its own, reporting to its bed. Its thread puts denoised utterances on
+    the shared queue, where the main loop batches them with other beds'.
+    """
+
+    def __init__(self, device, bed_id, utterances):
+        self.device = device
+        self.label = f"[{bed_id}] " if bed_id else ""
+        if bed_id is None:
+            self.client = monitoring_client
+        else:
+            self.client = MonitoringClient(
+                server_url=os.environ.get('PAIN_WATCHER_SERVER', 'http://localhost:5000'),
+                bed_id=bed_id,
+            )
+            self.client.start()
+        self.capture = StreamingCapture(SAMPLERATE, device=device, ring_seconds=RING_SECONDS)
+        self.segmenter = VADSegmenter(SAMPLERATE, min_speech=SPEECH_DURATION_MIN, max_segment=MAX_UTTERANCE)
+        self.denoiser = SpectralDenoiser(frame_length=512)
+        self.utterances = utterances
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        # Capture runs in the PortAudio callback thread; self.thread only segments
+        self.capture.start()
+        self.thread.start()
+
+    def run(self):
+        """Cut speech segments from the ring buffer and queue them, denoised"""
+        for start, block in self.capture.blocks(BLOCK_SECONDS):
+            segments = self.segmenter.feed(block, start)
+            if self.segmenter.block_silent:
+                self.denoiser.update_noise(block)
+            for seg_start, seg_end in segments:
+                if seg_start < self.capture.ring.oldest:
+                    print(f"{self.label}(utterance overwritten before it could be transcribed)")
+                    continue
+                audio = self.capture.ring.read(seg_start, seg_end)
+                self.utterances.put((self, reduce_noise(audio, SAMPLERATE, self.denoiser)))
+
+    def stop(self):
+        self.capture.stop()
+        if self.client is not monitoring_client:
+            self.client.stop()
+
+    def stats(self):
+        return (f"{self.label}input overflows: {self.capture.overflows}, "
+                f"skipped blocks: {self.capture.overruns}, "
+                f"utterances: {self.segmenter.segments} (ignored {self.segmenter.discarded} too short)")
+
+def next_batch(utterances):
+    """Block for one utterance, then take whatever else arrives within BATCH_WAIT"""
+    batch = [utterances.get()]
+    deadline = time.monotonic() + BATCH_WAIT
+    while len(batch) < MAX_BATCH:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(utterances.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
 chunk_count = 0
+microphones = []
+if STREAMING:
+    utterance_queue = queue.Queue()
+    microphones = [Microphone(device, bed, utterance_queue) for device, bed in MICROPHONES]
+    for microphone in microphones:
+        microphone.start()
 
 try:
     while True:
-        chunk_count += 1
-        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Recording chunk #{chunk_count}...", end=" ", flush=True)
-        
-        try:
-            # Record audio
+        if not STREAMING:
+            # Record audio (the microphone is off while the chunk is processed)
             audio = sd.rec(int(SAMPLERATE * DURATION), samplerate=SAMPLERATE, 
                           channels=1, device=DEVICE_ID, dtype=np.float32)
             sd.wait()
-            
-            audio = audio.flatten()
-            
-            # Step 1: Check if there's actual speech (VAD)
-            if not detect_speech(audio, SAMPLERATE):
-                print("(silence - no speech detected)")
-                continue
-            
-            # Step 2: Reduce noise
-            print("\n  Denoising...", end=" ", flush=True)
-            audio_clean = reduce_noise(audio, SAMPLERATE)
-            
-            # Step 3: Normalize
-            audio_clean = audio_clean / (np.max(np.abs(audio_clean)) + 1e-8)
-            
-            print("Transcribing...", end=" ", flush=True)
-            
-            # Transcribe with Whisper
-            result = model.transcribe(
-                audio_clean,
-                language="en",
-                verbose=False,
-                temperature=0.5,  # Greedy decoding
-            )
-            
-            text = result["text"].strip().lower()
-            
-            if text and len(text) > 3:  # Only show results with meaningful text (>3 chars)
-                print(f"✓\n  Heard: '{text}'")
-                
-                # Check for keywords
-                detected_keywords = [kw for kw in KEYWORDS if kw in text]
-                
-                # Send to backend
-                monitoring_client.send_audio_data(
-                    text=text,
-                    keywords=detected_keywords
-                )
-                
-                if detected_keywords:
-                    print("\n" + "!" * 70)
-                    print(f"🚨 CRITICAL AUDIO ALERT: {detected_keywords} detected!")
-                    print(f"   Transcription: '{text}'")
-                    print(f"   Timestamp: {datetime.now().isoformat()}")
-                    print("!" * 70)
-                else:
-                    print("   >> (No critical keywords detected)")
-            else:
-                print("(no meaningful speech)")
-                
+            chunk_count += 1
+            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Chunk #{chunk_count}...", end=" ", flush=True)
+            try:
+                process_chunk(audio.flatten())
+            except Exception as e:
+                print(f"Error during transcription: {e}")
+            continue
+
+        batch = next_batch(utterance_queue)
+        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Transcribing {len(batch)} utterance(s)...", end=" ", flush=True)
+        try:
+            results = transcribe_batch([audio for _, audio in batch])
         except Exception as e:
             print(f"Error during transcription: {e}")
             continue
+        for (microphone, audio), (text, detected_keywords, stage) in zip(batch, results):
+            chunk_count += 1
+            print(f"\n  Chunk #{chunk_count} {microphone.label}({len(audio) / SAMPLERATE:.1f}s utterance)", end=" ", flush=True)
+            report(microphone.client, text, detected_keywords, stage, microphone.label)
 
 except KeyboardInterrupt:
     print("\n\n" + "=" * 70)
     print("Audio monitor stopped.")
+    for microphone in microphones:
+        print(microphone.stats())
+    if cascade is not None:
+        print(f"Keyword cascade: {cascade.stats()}")
     print("=" * 70)
+finally:
+    for microphone in microphones:
+        microphone.stop()
+    monitoring_client.stop()
@@ -0,0 +1,108 @@
+"""
+Gap-free microphone capture for the audio monitor
+A callback InputStream writes every block into a preallocated ring
+buffer, so the microphone keeps recording while Whisper runs. The
+processing thread consumes the stream as consecutive blocks stamped with
+their absolute sample position (e.g. for a VAD segmenter), and reads
+utterances back from the ring by those positions.
+"""
+import threading
+import numpy as np
+import sounddevice as sd
+
+class AudioRing:
+    """
+    Fixed-size float32 ring addressed by absolute sample index.
+    `written` counts every sample ever written; samples older than
+    written - capacity have been overwritten.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.float32)
+        self.written = 0
+        self.cond = threading.Condition()
+
+    def write(self, samples):
+        """Append samples (called from the audio callback; never blocks for long)"""
+        with self.cond:
+            n = len(samples)
+            if n > self.capacity:
+                samples = samples[-self.capacity:]
+                self.written += n - self.capacity
+                n = self.capacity
+            start = self.written % self.capacity
+            first = min(n, self.capacity - start)
+            self.buffer[start:start + first] = samples[:first]
+            self.buffer[:n - first] = samples[first:]
+            self.written += n
+            self.cond.notify_all()
+
+    @property
+    def oldest(self):
+        """Absolute index of the oldest sample still held"""
+        return max(0, self.written - self.capacity)
+
+    def wait_for(self, end, timeout=None):
+        """Wait until sample `end` has been written; False on timeout"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.written >= end, timeout=timeout)
+
+    def read(self, start, end):
+        """Copy of samples [start, end); start must be >= oldest and end <= written"""
+        with self.cond:
+            if start < self.oldest or end > self.written:
+                raise ValueError(f"samples {start}-{end} not in ring ({self.oldest}-{self.written})")
+            if end == start:
+                return np.zeros(0, dtype=np.float32)
+            i, j = start % self.capacity, end % self.capacity
+            if i < j:
+                return self.buffer[i:j].copy()
+            return np.concatenate([self.buffer[i:], self.buffer[:j]])
+
+class StreamingCapture:
+    """Callback InputStream feeding an AudioRing, read back as consecutive blocks"""
+
+    def __init__(self, samplerate=16000, device=None, ring_seconds=60, blocksize=1600):
+        self.samplerate = samplerate
+        self.ring = AudioRing(int(ring_seconds * samplerate))
+        self.stream = sd.InputStream(samplerate=samplerate, device=device, channels=1,
+                                     dtype='float32', blocksize=blocksize, callback=self._callback)
+        self.overflows = 0  # Input overflows reported by PortAudio
+        self.overruns = 0   # Blocks the reader fell too far behind to read
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        self.ring.write(indata[:, 0])
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+        self.stream.close()
+
+    def blocks(self, duration):
+        """
+        Yield (start, samples) for consecutive `duration`-second blocks,
+        where start is the absolute index of the first sample. Samples
+        overwritten before they were read are skipped (counted as overruns).
+        """
+        size = int(duration * self.samplerate)
+        start = self.ring.written
+        while True:
+            while not self.ring.wait_for(start + size, timeout=1.0):
+                pass
+            if start < self.ring.oldest:
+                self.overruns += 1
+                start = self.ring.oldest
+            end = min(start + size, self.ring.written)
+            try:
+                block = self.ring.read(start, end)
+            except ValueError:
+                self.overruns += 1
+                start = self.ring.oldest
+                continue
+            yield start, block
+            start = end
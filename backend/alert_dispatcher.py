@@ -0,0 +1,98 @@
+"""
+Alert dispatch worker
+Ingest hands alerts to a bounded queue and returns immediately; a
+background worker drains the queue and emits them in batches, one
+'alert_batch' event per room. Slow WebSocket fan-out therefore never
+adds latency to ingest.
+"""
+from collections import defaultdict
+import queue
+import threading
+import time
+
+class AlertDispatcher:
+    """Bounded-queue alert delivery with depth, drop and latency counters"""
+
+    def __init__(self, socketio, max_queue=1000, batch_size=50, event='alert_batch'):
+        self.socketio = socketio
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.event = event
+        self.started = False
+        self.lock = threading.Lock()
+
+        self.submitted = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.batches = 0
+        self.latency_avg_ms = 0.0
+        self.latency_max_ms = 0.0
+
+    def submit(self, rooms, alert):
+        """Queue an alert for the given rooms; drops the oldest alert when full"""
+        item = (time.monotonic(), rooms, alert)
+        with self.lock:
+            self.submitted += 1
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        self.start()
+
+    def start(self):
+        """Start the worker once"""
+        if not self.started:
+            with self.lock:
+                if self.started:
+                    return
+                self.started = True
+            self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                print(f"Error dispatching alerts: {e}")
+
+    def _deliver(self, batch):
+        """Emit one event per room with every alert queued for it"""
+        by_room = defaultdict(list)
+        for _, rooms, alert in batch:
+            for room in rooms:
+                by_room[room].append(alert)
+        for room, alerts in by_room.items():
+            self.socketio.emit(self.event, {'alerts': alerts}, to=room)
+
+        now = time.monotonic()
+        for queued_at, _, _ in batch:
+            latency_ms = (now - queued_at) * 1000
+            self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+            # Exponential moving average, recent deliveries weigh most
+            self.latency_avg_ms += 0.1 * (latency_ms - self.latency_avg_ms)
+        self.delivered += len(batch)
+        self.batches += 1
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'submitted': self.submitted,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'latency_avg_ms': round(self.latency_avg_ms, 2),
+            'latency_max_ms': round(self.latency_max_ms, 2),
+        }
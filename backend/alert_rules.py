@@ -0,0 +1,175 @@
+"""
+Alert rule engine
+Turns per-sample readings into episode-level alerts. Each bed and alert
+type has its own episode state:
+
+    * hysteresis  - an episode opens above `enter` and only closes once
+                    the value drops to `exit` or below
+    * escalation  - an open WARNING episode raises one CRITICAL alert when
+                    the value crosses `critical`
+    * re-alerting - an open episode re-alerts at most every
+                    `realert_interval` seconds
+    * debouncing  - an episode that re-opens within `min_interval`
+                    seconds of closing continues without a new alert
+
+Rules return (action, episode) pairs with action one of 'open',
+'escalate', 'reminder', 'reopen' (a debounced re-entry, no new alert) or
+'close'; building and storing the alert records is left to the caller.
+"""
+import itertools
+import threading
+import time
+
+episode_ids = itertools.count(1)
+
+class Episode:
+    """One continuous alert condition for a bed"""
+
+    def __init__(self, alert_type, severity, value, now):
+        self.id = f"{alert_type.lower()}_episode_{next(episode_ids)}"
+        self.alert_type = alert_type
+        self.severity = severity
+        self.peak = value
+        self.opened_at = now
+        self.last_alert_at = now
+        self.last_seen = now
+        self.closed_at = None
+        self.keywords = set()
+        self.samples = 1
+        self.alert_ids = []  # Every alert raised for this episode
+
+    def to_dict(self):
+        return {
+            'episode_id': self.id,
+            'severity': self.severity,
+            'peak': self.peak,
+            'samples': self.samples,
+            'duration': round((self.closed_at or time.monotonic()) - self.opened_at, 1),
+        }
+
+class ThresholdRule:
+    """Hysteresis rule for a numeric reading"""
+
+    def __init__(self, alert_type, value_key, enter, exit, critical,
+                 min_interval=30, realert_interval=300, enter_condition=None):
+        self.alert_type = alert_type
+        self.value_key = value_key
+        self.enter = enter
+        self.exit = exit
+        self.critical = critical
+        self.min_interval = min_interval
+        self.realert_interval = realert_interval
+        self.enter_condition = enter_condition
+
+    def severity(self, value):
+        return 'CRITICAL' if value > self.critical else 'WARNING'
+
+    def evaluate(self, episode, entry, now):
+        """
+        Apply one reading to the latest episode (or None).
+        Returns (latest episode, [(action, episode), ...]).
+        """
+        value = entry.get(self.value_key) or 0
+
+        if episode is not None and episode.closed_at is None:
+            if value <= self.exit:
+                episode.closed_at = now
+                return episode, [('close', episode)]
+            return episode, self._continue(episode, value, now)
+
+        entering = value > self.enter and (self.enter_condition is None or self.enter_condition(entry))
+        if not entering:
+            return episode, []
+
+        # Flapping around the threshold: continue the recent episode quietly
+        if episode is not None and now - episode.closed_at < self.min_interval:
+            episode.closed_at = None
+            return episode, [('reopen', episode)] + self._continue(episode, value, now, remind=False)
+
+        episode = Episode(self.alert_type, self.severity(value), value, now)
+        return episode, [('open', episode)]
+
+    def _continue(self, episode, value, now, remind=True):
+        """Another above-threshold reading for an open episode"""
+        episode.samples += 1
+        episode.last_seen = now
+        episode.peak = max(episode.peak, value)
+        if episode.severity == 'WARNING' and value > self.critical:
+            episode.severity = 'CRITICAL'
+            episode.last_alert_at = now
+            return [('escalate', episode)]
+        if remind and now - episode.last_alert_at >= self.realert_interval:
+            episode.last_alert_at = now
+            return [('reminder', episode)]
+        return []
+
+class KeywordRule:
+    """
+    Episode rule for keyword detections. Utterances less than `episode_gap`
+    seconds apart form one episode; repeats of already-alerted keywords are
+    suppressed, new keywords re-alert, and `escalate_count` utterances in
+    one episode escalate it to CRITICAL.
+    """
+
+    def __init__(self, alert_type='AUDIO', episode_gap=60, escalate_count=3,
+                 critical_keywords=()):
+        self.alert_type = alert_type
+        self.episode_gap = episode_gap
+        self.escalate_count = escalate_count
+        self.critical_keywords = set(critical_keywords)
+
+    def evaluate(self, episode, entry, now):
+        """Same contract as ThresholdRule.evaluate"""
+        keywords = set(entry.get('keywords') or ())
+        actions = []
+
+        if episode is not None and episode.closed_at is None and now - episode.last_seen > self.episode_gap:
+            episode.closed_at = episode.last_seen
+            actions.append(('close', episode))
+        if not keywords:
+            return episode, actions
+
+        severity = 'CRITICAL' if keywords & self.critical_keywords else 'WARNING'
+        if episode is None or episode.closed_at is not None:
+            episode = Episode(self.alert_type, severity, len(keywords), now)
+            episode.keywords = set(keywords)
+            return episode, actions + [('open', episode)]
+
+        episode.samples += 1
+        episode.last_seen = now
+        new_keywords = keywords - episode.keywords
+        episode.keywords |= keywords
+        episode.peak = max(episode.peak, len(episode.keywords))
+        if episode.severity == 'WARNING' and (severity == 'CRITICAL' or episode.samples >= self.escalate_count):
+            episode.severity = 'CRITICAL'
+            episode.last_alert_at = now
+            return episode, [('escalate', episode)]
+        if new_keywords:
+            episode.last_alert_at = now
+            return episode, [('reminder', episode)]
+        return episode, []
+
+class AlertEngine:
+    """Per-bed episode state for a set of rules keyed by stream"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.episodes = {}
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def evaluate(self, stream, entry, now=None):
+        """[(action, episode), ...] for a reading of the given stream"""
+        rule = self.rules[stream]
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            episode, actions = rule.evaluate(self.episodes.get(stream), entry, now)
+            self.episodes[stream] = episode
+            if episode is not None and episode.closed_at is None and not actions:
+                self.suppressed += 1
+        return actions
+
+    def open_episodes(self):
+        with self.lock:
+            return [e.to_dict() for e in self.episodes.values()
+                    if e is not None and e.closed_at is None]
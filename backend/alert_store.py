@@ -0,0 +1,156 @@
+"""
+Indexed in-memory alert store
+Keeps alerts in arrival order with per-severity, per-type and
+acknowledgement indexes so filtered queries and counters never scan
+the whole buffer.
+"""
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+import threading
+
+class AlertStore:
+    """Bounded alert buffer with O(1) counters and acknowledgement state"""
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self.alerts = OrderedDict()                # id -> alert, oldest first
+        self.by_severity = defaultdict(OrderedDict)  # severity -> ids
+        self.by_type = defaultdict(OrderedDict)      # type -> ids
+        self.unacked = OrderedDict()                 # ids not acknowledged yet
+        self.acked = {}                              # id -> acknowledgement record
+        self.version = 0                             # Bumped on every change
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.alerts)
+
+    def add(self, alert):
+        """Store an alert, evicting the oldest one when full"""
+        alert_id = alert['id']
+        alert.setdefault('acknowledged', False)
+        with self.lock:
+            if alert_id in self.alerts:
+                self._remove(alert_id)
+            self.alerts[alert_id] = alert
+            self.by_severity[alert.get('severity')][alert_id] = None
+            self.by_type[alert.get('type')][alert_id] = None
+            if alert['acknowledged']:
+                self.acked[alert_id] = {'acknowledged_at': alert.get('acknowledged_at')}
+            else:
+                self.unacked[alert_id] = None
+
+            while len(self.alerts) > self.max_size:
+                self._remove(next(iter(self.alerts)))
+            self.version += 1
+
+    def _remove(self, alert_id):
+        """Drop an alert from the buffer and every index (lock held)"""
+        alert = self.alerts.pop(alert_id)
+        self._discard(self.by_severity, alert.get('severity'), alert_id)
+        self._discard(self.by_type, alert.get('type'), alert_id)
+        self.unacked.pop(alert_id, None)
+        self.acked.pop(alert_id, None)
+
+    @staticmethod
+    def _discard(index, key, alert_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.pop(alert_id, None)
+            if not ids:
+                del index[key]
+
+    def get(self, alert_id):
+        """Look up an alert by id"""
+        with self.lock:
+            return self.alerts.get(alert_id)
+
+    def acknowledge(self, alert_id, by=None):
+        """Mark an alert as acknowledged. Returns the alert, or None if unknown."""
+        with self.lock:
+            alert = self.alerts.get(alert_id)
+            if alert is None:
+                return None
+            if alert_id not in self.acked:
+                record = {'acknowledged_at': datetime.now().isoformat(), 'acknowledged_by': by}
+                self.acked[alert_id] = record
+                self.unacked.pop(alert_id, None)
+                alert['acknowledged'] = True
+                alert.update(record)
+                self.version += 1
+            return alert
+
+    def update(self, alert_id, **fields):
+        """Update fields of a stored alert. Returns the alert, or None if evicted."""
+        with self.lock:
+            alert = self.alerts.get(alert_id)
+            if alert is not None:
+                alert.update(fields)
+                self.version += 1
+            return alert
+
+    def _candidates(self, severity, alert_type, acked):
+        """Smallest index that covers the requested filters (lock held)"""
+        indexes = []
+        if severity is not None:
+            indexes.append(self.by_severity.get(severity, {}))
+        if alert_type is not None:
+            indexes.append(self.by_type.get(alert_type, {}))
+        if acked is False:
+            indexes.append(self.unacked)
+        if not indexes:
+            return self.alerts
+        return min(indexes, key=len)
+
+    def _matches(self, alert_id, severity, alert_type, acked):
+        alert = self.alerts[alert_id]
+        return ((severity is None or alert.get('severity') == severity) and
+                (alert_type is None or alert.get('type') == alert_type) and
+                (acked is None or (alert_id in self.acked) == acked))
+
+    def query(self, severity=None, alert_type=None, acked=None, since=None, limit=None):
+        """
+        Alerts matching all given filters, oldest first.
+        since is an ISO timestamp; only newer alerts are returned.
+        Walks the smallest matching index from the newest end and stops
+        at the limit or at the first alert older than since.
+        """
+        result = []
+        with self.lock:
+            candidates = self._candidates(severity, alert_type, acked)
+            for alert_id in reversed(candidates):
+                alert = self.alerts[alert_id]
+                if since is not None and alert['timestamp'] <= since:
+                    break
+                if self._matches(alert_id, severity, alert_type, acked):
+                    result.append(alert)
+                    if limit is not None and len(result) >= limit:
+                        break
+        result.reverse()
+        return result
+
+    def count(self, severity=None, alert_type=None, acked=None):
+        """Number of alerts matching the filters, from counters where possible"""
+        with self.lock:
+            filters = [f for f in (severity, alert_type, acked) if f is not None]
+            if not filters:
+                return len(self.alerts)
+            if len(filters) == 1:
+                if severity is not None:
+                    return len(self.by_severity.get(severity, ()))
+                if alert_type is not None:
+                    return len(self.by_type.get(alert_type, ()))
+                return len(self.acked) if acked else len(self.unacked)
+            candidates = self._candidates(severity, alert_type, acked)
+            return sum(1 for alert_id in candidates
+                       if self._matches(alert_id, severity, alert_type, acked))
+
+    def stats(self):
+        """Running counters for dashboards"""
+        with self.lock:
+            return {
+                'total': len(self.alerts),
+                'version': self.version,
+                'unacknowledged': len(self.unacked),
+                'by_severity': {k: len(v) for k, v in self.by_severity.items()},
+                'by_type': {k: len(v) for k, v in self.by_type.items()},
+            }
@@ -2,61 +2,487 @@
 Backend API Server for Pain Watcher
 Integrates with Python monitoring scripts via REST API and WebSocket
 """
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, make_response
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit, join_room
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from datetime import datetime, timedelta
-from collections import deque
 import threading
+import atexit
+import itertools
+import heapq
 import queue
 import json
+import math
 import os
 
+from alert_store import AlertStore
+from history_buffer import ReadingBuffer, EntryBuffer, to_epoch
+from timeseries_store import TimeSeriesStore
+from rollups import Rollups, TIERS, MAX_POINTS, choose_resolution, bucket_dict
+from response_cache import ResponseCache
+from live_push import LivePublisher, subscription_rooms
+from alert_dispatcher import AlertDispatcher
+from alert_rules import AlertEngine, ThresholdRule, KeywordRule
+
 app = Flask(__name__)
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Max live status emits per second and room (PAIN_WATCHER_PUSH_HZ)
+LIVE_PUSH_MAX_HZ = float(os.environ.get('PAIN_WATCHER_PUSH_HZ', 2))
+live_publisher = LivePublisher(socketio, max_hz=LIVE_PUSH_MAX_HZ)
+
+# Alerts are emitted by a background worker, never from the ingest path
+alert_dispatcher = AlertDispatcher(socketio, max_queue=1000, batch_size=50)
+
 # ============================================================================
-# DATA STORAGE (In-Memory)
+# DATA STORAGE (In-Memory, one shard per bed)
 # ============================================================================
 
+DEFAULT_BED = 'default'
+
+# Readings kept in memory per bed and stream; the default is one hour at 30 readings/s
+HISTORY_SIZE = int(os.environ.get('PAIN_WATCHER_HISTORY_SIZE', 108000))
+AUDIO_HISTORY_SIZE = int(os.environ.get('PAIN_WATCHER_AUDIO_HISTORY_SIZE', 1000))
+
+# On-disk store for every reading (PAIN_WATCHER_DB, set it empty to disable)
+DB_PATH = os.environ.get('PAIN_WATCHER_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitoring.db'))
+# Days of readings kept on disk (PAIN_WATCHER_DB_RETENTION_DAYS, 0 keeps everything)
+DB_RETENTION_DAYS = float(os.environ.get('PAIN_WATCHER_DB_RETENTION_DAYS', 7))
+# Most rows a history request returns ('?limit=' is capped to it)
+RANGE_QUERY_LIMIT = 10000
+
+# Numeric columns of the compact history buffers ('d' = float, None kept as NaN)
+PAIN_FIELDS = {'score': 'd', 'au04': 'd', 'au07': 'd', 'au10': 'd'}
+AGITATION_FIELDS = {'level': 'l', 'head_speed': 'd', 'arm_speed': 'd'}
+
+# Statuses accepted per stream: what the monitors send and the dashboard shows
+PAIN_STATUSES = ('COMFORT', 'PAIN DETECTED')
+AGITATION_STATUSES = ('CALM', 'WARNING', 'CRITICAL', 'Warning: Restless', 'CRITICAL: PATIENT THRASHING')
+
+# Field aggregated into the rollup tiers (rollups.TIERS) for each numeric stream
+ROLLUP_FIELDS = {'pain': 'score', 'agitation': 'level'}
+
+# Episode rules per stream; thresholds match the monitors' own (see alert_rules.py)
+ALERT_RULES = {
+    'pain': ThresholdRule('PAIN', 'score', enter=1.5, exit=1.0, critical=3,
+                          min_interval=30, realert_interval=300,
+                          enter_condition=lambda entry: entry['status'] == 'PAIN DETECTED'),
+    'agitation': ThresholdRule('AGITATION', 'level', enter=10, exit=5, critical=20,
+                               min_interval=30, realert_interval=120),
+    'audio': KeywordRule('AUDIO', episode_gap=60, escalate_count=3,
+                         critical_keywords=('help', 'emergency')),
+}
+
 # Store recent data for quick retrieval
 class MonitoringData:
-    def __init__(self, max_size=200):
-        self.pain_history = deque(maxlen=max_size)
-        self.agitation_history = deque(maxlen=max_size)
-        self.audio_history = deque(maxlen=max_size)
-        self.alerts = deque(maxlen=100)
+    def __init__(self, bed_id=DEFAULT_BED, history_size=HISTORY_SIZE):
+        self.bed_id = bed_id
+        self.pain_history = ReadingBuffer(history_size, PAIN_FIELDS)
+        self.agitation_history = ReadingBuffer(history_size, AGITATION_FIELDS)
+        self.audio_history = EntryBuffer(AUDIO_HISTORY_SIZE)
+        self.pain_rollups = Rollups(ROLLUP_FIELDS['pain'])
+        self.agitation_rollups = Rollups(ROLLUP_FIELDS['agitation'])
+        self.alerts = AlertStore(max_size=100)
         
-        self.current_pain = {'score': 0, 'status': 'COMFORT', 'timestamp': None}
-        self.current_agitation = {'level': 0, 'status': 'CALM', 'timestamp': None}
-        self.current_audio = {'text': '', 'keywords': [], 'timestamp': None}
+        self.current_pain = {'score': 0, 'status': 'COMFORT', 'timestamp': None, 'seq': 0}
+        self.current_agitation = {'level': 0, 'status': 'CALM', 'timestamp': None, 'seq': 0}
+        self.current_audio = {'text': '', 'keywords': [], 'timestamp': None, 'seq': 0}
         
-        self.lock = threading.Lock()
+        # Monotonic per-stream sequence numbers, stamped on every entry
+        self.pain_seq = 0
+        self.agitation_seq = 0
+        self.audio_seq = 0
+        
+        # Pre-serialized status/history bodies, rebuilt once per change
+        self.cache = ResponseCache()
+        
+        # Hysteresis/episode state so a long episode raises a few alerts, not one per reading
+        self.alert_engine = AlertEngine(ALERT_RULES)
+        
+        # One lock per stream, so a bed's monitors never wait on each other
+        self.pain_lock = threading.Lock()
+        self.agitation_lock = threading.Lock()
+        self.audio_lock = threading.Lock()
+
+class BedRegistry:
+    """Maps bed ids to their MonitoringData shard"""
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.history_size = history_size
+        self.beds = {}
+        self.lock = threading.Lock()  # Only taken when a new bed appears
+    
+    def get(self, bed_id):
+        """Get the shard for a bed, creating it on first use"""
+        store = self.beds.get(bed_id)
+        if store is None:
+            with self.lock:
+                store = self.beds.get(bed_id)
+                if store is None:
+                    store = MonitoringData(bed_id, self.history_size)
+                    self.beds[bed_id] = store
+        return store
+    
+    def find(self, bed_id):
+        """Existing shard for a bed, or None (never creates one)"""
+        return self.beds.get(bed_id)
+    
+    def all(self):
+        """Snapshot of all shards"""
+        return list(self.beds.values())
+
+beds = BedRegistry()
+beds.get(DEFAULT_BED)  # Exists from the start, so requests without a bed id always work
+
+timeseries = None
+if DB_PATH:
+    timeseries = TimeSeriesStore(DB_PATH, retention=DB_RETENTION_DAYS * 86400 or None)
+    timeseries.start()
+    atexit.register(timeseries.stop)
+
+def get_bed_id(data=None):
+    """Bed id from the payload's 'bed_id' or the '?bed=' query parameter"""
+    bed_id = (data or {}).get('bed_id') or request.args.get('bed')
+    return str(bed_id) if bed_id else DEFAULT_BED
+
+def parse_number(data, name, default=None, kind=float):
+    """Finite numeric payload field (None stays None); ValueError for anything else"""
+    value = data.get(name, default)
+    if value is None:
+        return None
+    try:
+        number = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{name}' must be a number, got {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"'{name}' must be a finite number, got {value!r}")
+    return number
+
+def parse_status(data, default, allowed):
+    """Payload 'status', which must be one of the stream's known statuses"""
+    status = data.get('status', default)
+    if status not in allowed:
+        raise ValueError(f"'status' must be one of {', '.join(allowed)}, got {status!r}")
+    return status
+
+def get_store(data=None):
+    """Shard for the bed a reading is for, created on its first reading"""
+    return beds.get(get_bed_id(data))
+
+def find_store():
+    """Shard for the bed a read request addresses, or None if the bed is unknown"""
+    return beds.find(get_bed_id())
+
+def unknown_bed():
+    return jsonify({'error': 'Unknown bed', 'bed_id': get_bed_id()}), 404
+
+alert_ids = itertools.count(1)
+
+def new_alert_id(prefix):
+    """Unique alert id, also when several alerts share a timestamp"""
+    return f"{prefix}_{datetime.now().timestamp()}_{next(alert_ids)}"
+
+# Changes on every restart so ETags from a previous run never match
+BOOT_ID = format(int(datetime.now().timestamp() * 1000), 'x')
+
+def make_etag(*parts):
+    """ETag value built from the versions a response depends on"""
+    return ':'.join(str(p) for p in (BOOT_ID,) + parts)
+
+def not_modified(etag):
+    """True if the client already holds the response for this ETag"""
+    return request.if_none_match.contains_weak(etag)
+
+def etag_response(etag, payload=None):
+    """JSON response carrying an ETag, or an empty 304 when payload is None"""
+    if payload is None:
+        response = make_response('', 304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    return response
+
+def parse_since():
+    """Sequence cursor from '?since=<seq>', or None"""
+    return request.args.get('since', default=None, type=int)
+
+def parse_time_arg(name):
+    """Epoch seconds from an epoch or ISO query parameter, or None; ValueError if unparsable"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        epoch = float(value)
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            raise ValueError(f"'{name}' must be epoch seconds or an ISO timestamp, got {value!r}")
+    if not math.isfinite(epoch):
+        raise ValueError(f"'{name}' must be a finite number, got {value!r}")
+    return epoch
+
+def serve_rollups(store, stream, resolution, start, end):
+    """Aggregated history: in-memory tiers, or the on-disk store for older ranges"""
+    if stream not in ROLLUP_FIELDS:
+        return jsonify({'error': f'No rollups for {stream}'}), 400
+    if resolution == 'auto':
+        resolution = choose_resolution(start, end)
+    if resolution not in TIERS:
+        return jsonify({'error': f"Unknown resolution, use one of {', '.join(TIERS)}, auto or raw"}), 400
+    limit = request.args.get('limit', default=MAX_POINTS, type=int)
+    
+    rollups = getattr(store, f'{stream}_rollups')
+    with getattr(store, f'{stream}_lock'):
+        in_memory = rollups.covers(resolution, start) or timeseries is None
+        if in_memory:
+            points = rollups.query(resolution, start, end, limit)
+    if not in_memory:
+        width = TIERS[resolution][0]
+        rows = timeseries.rollup(store.bed_id, stream, ROLLUP_FIELDS[stream], width, start, end, limit)
+        points = [bucket_dict(*row) for row in rows]
+    
+    return jsonify({'history': points, 'total': len(points), 'resolution': resolution,
+                    'field': ROLLUP_FIELDS[stream], 'from': start, 'to': end})
+
+def serve_history(stream):
+    """
+    History response for a stream of the requested bed:
+    ?resolution=1s|10s|1m|5m|15m|1h|auto serves min/max/mean/count buckets,
+    ?from=&to= reads a time range from the on-disk store, otherwise the
+    in-memory window (?limit=, ?since=) is served from the response cache.
+    """
+    store = find_store()
+    if store is None:
+        return unknown_bed()
+    try:
+        start, end = parse_time_arg('from'), parse_time_arg('to')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    resolution = request.args.get('resolution', 'raw')
+    if resolution != 'raw':
+        return serve_rollups(store, stream, resolution, start, end)
+    if start is not None or end is not None:
+        if timeseries is None:
+            return jsonify({'error': 'Persistent storage is disabled'}), 400
+        limit = min(request.args.get('limit', default=RANGE_QUERY_LIMIT, type=int), RANGE_QUERY_LIMIT)
+        history = timeseries.query(store.bed_id, stream, start, end, limit)
+        return jsonify({'history': history, 'total': len(history),
+                        'from': start, 'to': end, 'truncated': len(history) >= limit})
+    
+    limit = min(request.args.get('limit', default=100, type=int), RANGE_QUERY_LIMIT)
+    since = parse_since()
+    etag = history_etag(store, stream, limit, since)
+    if not_modified(etag):
+        return etag_response(etag)
+    return cached_response(*history_body(store, stream, limit, since))
+
+def record_reading(store, stream, entry):
+    """Queue a reading for the on-disk store (never blocks ingest)"""
+    if timeseries is not None:
+        timeseries.append(store.bed_id, stream, entry['seq'], to_epoch(entry['timestamp']), entry)
+
+# History windows worth caching; other limits are encoded per request
+CACHED_HISTORY_LIMITS = (50, 100, 200)
+
+def encode_json(payload):
+    """Serialize a payload once, the same way jsonify would"""
+    return app.json.dumps(payload).encode('utf-8')
+
+def cached_response(etag, body):
+    """Response serving pre-serialized JSON bytes"""
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def status_etag(store, stream):
+    return make_etag(store.bed_id, stream, getattr(store, f'{stream}_seq'))
+
+def history_etag(store, stream, limit, since):
+    return make_etag(store.bed_id, stream, getattr(store, f'{stream}_seq'), limit, since)
+
+def system_status_etag(store):
+    return make_etag(store.bed_id, store.pain_seq, store.agitation_seq,
+                     store.audio_seq, store.alerts.version)
+
+def status_body(store, stream):
+    """(etag, body) for a stream's current status, encoded once per reading"""
+    key = f'{stream}/status'
+    etag = status_etag(store, stream)
+    body = store.cache.get(key, etag)
+    if body is None:
+        with getattr(store, f'{stream}_lock'):
+            etag = status_etag(store, stream)
+            current = getattr(store, f'current_{stream}')
+        body = encode_json(current)
+        store.cache.put(key, etag, body)
+    return etag, body
+
+def history_body(store, stream, limit, since):
+    """(etag, body) for a history window; default windows are encoded once per reading"""
+    key = f'{stream}/history:{limit}'
+    cacheable = since is None and limit in CACHED_HISTORY_LIMITS
+    etag = history_etag(store, stream, limit, since)
+    body = store.cache.get(key, etag) if cacheable else None
+    if body is None:
+        with getattr(store, f'{stream}_lock'):
+            etag = history_etag(store, stream, limit, since)
+            history = getattr(store, f'{stream}_history')
+            latest_seq = getattr(store, f'{stream}_seq')
+            # A cursor ahead of the stream is from before a restart: start over
+            reset = since is not None and since > latest_seq
+            snapshot = history.snapshot(limit, None if reset else since)
+            total = len(history)
+        # Dicts are built outside the lock so a large window never stalls ingest
+        body = encode_json({'history': snapshot.window(limit), 'total': total,
+                            'latest_seq': latest_seq, 'reset': reset})
+        if cacheable:
+            store.cache.put(key, etag, body)
+    return etag, body
+
+def system_status_body(store):
+    """(etag, body) for the bed's system status, encoded once per change"""
+    etag = system_status_etag(store)
+    body = store.cache.get('system/status', etag)
+    if body is not None:
+        return etag, body
+    
+    with store.pain_lock:
+        current_pain = store.current_pain
+        total_pain = len(store.pain_history)
+    with store.agitation_lock:
+        current_agitation = store.current_agitation
+        total_agitation = len(store.agitation_history)
+    with store.audio_lock:
+        current_audio = store.current_audio
+        total_audio = len(store.audio_history)
+    alert_stats = store.alerts.stats()
+    # Tag with the versions the snapshot was actually taken from
+    etag = make_etag(store.bed_id, current_pain['seq'], current_agitation['seq'],
+                     current_audio['seq'], alert_stats['version'])
+    
+    body = encode_json({
+        'bed_id': store.bed_id,
+        'pain': current_pain,
+        'agitation': current_agitation,
+        'audio': current_audio,
+        'stats': {
+            'total_pain_readings': total_pain,
+            'total_agitation_readings': total_agitation,
+            'total_audio_readings': total_audio,
+            'total_alerts': alert_stats['total'],
+            'critical_alerts': alert_stats['by_severity'].get('CRITICAL', 0),
+            'unacknowledged_alerts': alert_stats['unacknowledged'],
+        }
+    })
+    store.cache.put('system/status', etag, body)
+    return etag, body
+
+def publish_update(store, stream, entry):
+    """Refresh cached bodies and queue a live push after a reading"""
+    status_body(store, stream)
+    system_status_body(store)
+    live_publisher.publish(store.bed_id, stream, entry)
+
+def raise_alerts(store, stream, entry, message):
+    """Turn the rule engine's episode actions for a reading into alerts"""
+    for action, episode in store.alert_engine.evaluate(stream, entry):
+        if action in ('close', 'reopen'):
+            # Every alert of the episode follows its state
+            state = 'closed' if action == 'close' else 'open'
+            for alert_id in episode.alert_ids:
+                store.alerts.update(alert_id, episode_state=state, episode=episode.to_dict())
+            continue
+        if action == 'escalate':
+            message += ' (escalated)'
+        elif action == 'reminder':
+            message += ' (ongoing)'
+        alert = {
+            'id': new_alert_id(stream),
+            'type': episode.alert_type,
+            'severity': episode.severity,
+            'timestamp': datetime.now().isoformat(),
+            'message': message,
+            'data': entry,
+            'episode_id': episode.id,
+            'episode_state': 'open',
+            'episode_action': action,
+        }
+        episode.alert_ids.append(alert['id'])
+        add_alert(store, alert)
 
-data_store = MonitoringData()
+def add_alert(store, alert):
+    """Store an alert for a bed and queue it for the alert rooms"""
+    alert['bed_id'] = store.bed_id
+    store.alerts.add(alert)
+    alert_dispatcher.submit(('alerts', f'alerts:{store.bed_id}'), alert)
 
 # ============================================================================
 # ALERT ROUTES
 # ============================================================================
 
+def parse_alert_filters():
+    """Read ?severity=&type=&acked=&since= into AlertStore.query arguments"""
+    filters = {
+        'severity': request.args.get('severity') or None,
+        'alert_type': request.args.get('type') or None,
+        'acked': None,
+        'since': None,
+    }
+    acked = request.args.get('acked')
+    if acked is not None and acked != '':
+        filters['acked'] = acked.lower() in ('1', 'true', 'yes')
+    since = request.args.get('since')
+    if since:
+        try:
+            filters['since'] = datetime.fromtimestamp(float(since)).isoformat()
+        except ValueError:
+            filters['since'] = since  # Already an ISO timestamp
+    return filters
+
+def query_alerts(limit, severity=None, alert_type=None, acked=None, since=None):
+    """
+    Alerts for '?bed=' or, without it, for every bed in time order.
+    Returns (alerts, total matching).
+    """
+    stores = [find_store()] if request.args.get('bed') else beds.all()
+    stores = [store for store in stores if store is not None]
+    per_bed = [store.alerts.query(severity, alert_type, acked, since, limit) for store in stores]
+    alerts = list(heapq.merge(*per_bed, key=lambda a: a['timestamp']))[-limit:]
+    if since is None:
+        total = sum(store.alerts.count(severity, alert_type, acked) for store in stores)
+    else:
+        total = len(alerts)
+    return alerts, total
+
 @app.route('/api/alerts', methods=['GET'])
 def get_alerts():
-    """Get all alerts with optional limit"""
+    """Get alerts, optionally filtered by ?severity=&type=&acked=&since="""
     limit = request.args.get('limit', default=50, type=int)
-    alerts = list(data_store.alerts)[-limit:]
-    return jsonify({'alerts': alerts, 'total': len(data_store.alerts)})
+    alerts, total = query_alerts(limit, **parse_alert_filters())
+    return jsonify({'alerts': alerts, 'total': total})
 
 @app.route('/api/alerts/critical', methods=['GET'])
 def get_critical_alerts():
     """Get only critical alerts"""
-    critical = [a for a in data_store.alerts if a.get('severity') == 'CRITICAL']
-    return jsonify({'alerts': critical, 'total': len(critical)})
+    limit = request.args.get('limit', default=100, type=int)
+    filters = parse_alert_filters()
+    filters['severity'] = 'CRITICAL'
+    alerts, total = query_alerts(limit, **filters)
+    return jsonify({'alerts': alerts, 'total': total})
 
 @app.route('/api/alerts/<alert_id>/acknowledge', methods=['POST'])
 def acknowledge_alert(alert_id):
     """Mark an alert as acknowledged"""
-    return jsonify({'status': 'acknowledged', 'alert_id': alert_id})
+    data = request.get_json(silent=True) or {}
+    stores = [find_store()] if request.args.get('bed') else beds.all()
+    stores = [store for store in stores if store is not None]
+    for store in stores:
+        alert = store.alerts.acknowledge(alert_id, by=data.get('acknowledged_by'))
+        if alert is not None:
+            return jsonify({'status': 'acknowledged', 'alert_id': alert_id,
+                            'acknowledged_at': alert['acknowledged_at']})
+    return jsonify({'error': 'Alert not found', 'alert_id': alert_id}), 404
 
 # ============================================================================
 # PAIN MONITORING ROUTES
@@ -65,48 +491,53 @@ def acknowledge_alert(alert_id):
 @app.route('/api/pain/status', methods=['GET'])
 def get_pain_status():
     """Get current pain detection status"""
-    with data_store.lock:
-        return jsonify(data_store.current_pain)
+    store = find_store()
+    if store is None:
+        return unknown_bed()
+    etag = status_etag(store, 'pain')
+    if not_modified(etag):
+        return etag_response(etag)
+    return cached_response(*status_body(store, 'pain'))
 
 @app.route('/api/pain/history', methods=['GET'])
 def get_pain_history():
-    """Get pain detection history"""
-    limit = request.args.get('limit', default=100, type=int)
-    with data_store.lock:
-        history = list(data_store.pain_history)[-limit:]
-    return jsonify({'history': history, 'total': len(data_store.pain_history)})
+    """Get pain detection history (?limit=, ?since=<seq>, ?from=&to=, ?resolution=)"""
+    return serve_history('pain')
+
+def ingest_pain(data):
+    """Record one pain reading and raise an alert if needed"""
+    store = get_store(data)
+    pain_entry = {
+        'score': parse_number(data, 'score', 0),
+        'status': parse_status(data, 'COMFORT', PAIN_STATUSES),
+        'au04': parse_number(data, 'au04'),
+        'au07': parse_number(data, 'au07'),
+        'au10': parse_number(data, 'au10'),
+        'timestamp': data.get('timestamp') or datetime.now().isoformat(),
+    }
+    
+    with store.pain_lock:
+        # The seq is only taken once the entry is stored, so seqs stay contiguous
+        pain_entry['seq'] = store.pain_seq + 1
+        store.pain_history.append(pain_entry)
+        store.pain_seq = pain_entry['seq']
+        store.pain_rollups.add(to_epoch(pain_entry['timestamp']), pain_entry)
+        store.current_pain = pain_entry
+    
+    # Episode-level alerts, debounced by the rule engine
+    raise_alerts(store, 'pain', pain_entry, f"Pain Detected: Score {pain_entry['score']:.2f}")
+    
+    record_reading(store, 'pain', pain_entry)
+    publish_update(store, 'pain', pain_entry)
+    return pain_entry
 
 @app.route('/api/pain/update', methods=['POST'])
 def update_pain_status():
     """Update pain detection data (called by monitoring script)"""
-    data = request.get_json()
-    
-    with data_store.lock:
-        pain_entry = {
-            'score': data.get('score', 0),
-            'status': data.get('status', 'COMFORT'),
-            'au04': data.get('au04'),
-            'au07': data.get('au07'),
-            'au10': data.get('au10'),
-            'timestamp': datetime.now().isoformat(),
-        }
-        
-        data_store.pain_history.append(pain_entry)
-        data_store.current_pain = pain_entry
-        
-        # Create alert if pain detected
-        if pain_entry['status'] == 'PAIN DETECTED' and pain_entry['score'] > 1.5:
-            alert = {
-                'id': f"pain_{datetime.now().timestamp()}",
-                'type': 'PAIN',
-                'severity': 'CRITICAL' if pain_entry['score'] > 3 else 'WARNING',
-                'timestamp': datetime.now().isoformat(),
-                'message': f"Pain Detected: Score {pain_entry['score']:.2f}",
-                'data': pain_entry,
-            }
-            data_store.alerts.append(alert)
-            socketio.emit('pain_alert', alert)
-    
+    try:
+        pain_entry = ingest_pain(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify({'status': 'updated', 'data': pain_entry})
 
 # ============================================================================
@@ -116,47 +547,52 @@ def update_pain_status():
 @app.route('/api/agitation/status', methods=['GET'])
 def get_agitation_status():
     """Get current agitation detection status"""
-    with data_store.lock:
-        return jsonify(data_store.current_agitation)
+    store = find_store()
+    if store is None:
+        return unknown_bed()
+    etag = status_etag(store, 'agitation')
+    if not_modified(etag):
+        return etag_response(etag)
+    return cached_response(*status_body(store, 'agitation'))
 
 @app.route('/api/agitation/history', methods=['GET'])
 def get_agitation_history():
-    """Get agitation detection history"""
-    limit = request.args.get('limit', default=100, type=int)
-    with data_store.lock:
-        history = list(data_store.agitation_history)[-limit:]
-    return jsonify({'history': history, 'total': len(data_store.agitation_history)})
+    """Get agitation detection history (?limit=, ?since=<seq>, ?from=&to=, ?resolution=)"""
+    return serve_history('agitation')
+
+def ingest_agitation(data):
+    """Record one agitation reading and raise an alert if needed"""
+    store = get_store(data)
+    agitation_entry = {
+        'level': parse_number(data, 'level', 0, kind=int),
+        'status': parse_status(data, 'CALM', AGITATION_STATUSES),
+        'head_speed': parse_number(data, 'head_speed'),
+        'arm_speed': parse_number(data, 'arm_speed'),
+        'timestamp': data.get('timestamp') or datetime.now().isoformat(),
+    }
+    
+    with store.agitation_lock:
+        # The seq is only taken once the entry is stored, so seqs stay contiguous
+        agitation_entry['seq'] = store.agitation_seq + 1
+        store.agitation_history.append(agitation_entry)
+        store.agitation_seq = agitation_entry['seq']
+        store.agitation_rollups.add(to_epoch(agitation_entry['timestamp']), agitation_entry)
+        store.current_agitation = agitation_entry
+    
+    # Episode-level alerts, debounced by the rule engine
+    raise_alerts(store, 'agitation', agitation_entry, f"Agitation Level: {agitation_entry['level']}")
+    
+    record_reading(store, 'agitation', agitation_entry)
+    publish_update(store, 'agitation', agitation_entry)
+    return agitation_entry
 
 @app.route('/api/agitation/update', methods=['POST'])
 def update_agitation_status():
     """Update agitation detection data (called by monitoring script)"""
-    data = request.get_json()
-    
-    with data_store.lock:
-        agitation_entry = {
-            'level': data.get('level', 0),
-            'status': data.get('status', 'CALM'),
-            'head_speed': data.get('head_speed'),
-            'arm_speed': data.get('arm_speed'),
-            'timestamp': datetime.now().isoformat(),
-        }
-        
-        data_store.agitation_history.append(agitation_entry)
-        data_store.current_agitation = agitation_entry
-        
-        # Create alert if agitated
-        if agitation_entry['level'] > 10:
-            alert = {
-                'id': f"agitation_{datetime.now().timestamp()}",
-                'type': 'AGITATION',
-                'severity': 'CRITICAL' if agitation_entry['level'] > 20 else 'WARNING',
-                'timestamp': datetime.now().isoformat(),
-                'message': f"Agitation Level: {agitation_entry['level']}",
-                'data': agitation_entry,
-            }
-            data_store.alerts.append(alert)
-            socketio.emit('agitation_alert', alert)
-    
+    try:
+        agitation_entry = ingest_agitation(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify({'status': 'updated', 'data': agitation_entry})
 
 # ============================================================================
@@ -166,47 +602,97 @@ def update_agitation_status():
 @app.route('/api/audio/status', methods=['GET'])
 def get_audio_status():
     """Get current audio transcription status"""
-    with data_store.lock:
-        return jsonify(data_store.current_audio)
+    store = find_store()
+    if store is None:
+        return unknown_bed()
+    etag = status_etag(store, 'audio')
+    if not_modified(etag):
+        return etag_response(etag)
+    return cached_response(*status_body(store, 'audio'))
 
 @app.route('/api/audio/history', methods=['GET'])
 def get_audio_history():
-    """Get audio transcription history"""
-    limit = request.args.get('limit', default=100, type=int)
-    with data_store.lock:
-        history = list(data_store.audio_history)[-limit:]
-    return jsonify({'history': history, 'total': len(data_store.audio_history)})
+    """Get audio transcription history (?limit=, ?since=<seq>, or ?from=&to= time range)"""
+    return serve_history('audio')
+
+def ingest_audio(data):
+    """Record one audio transcription and raise an alert if needed"""
+    store = get_store(data)
+    keywords = data.get('keywords') or []
+    if not isinstance(keywords, list):
+        raise ValueError(f"'keywords' must be a list, got {keywords!r}")
+    audio_entry = {
+        'text': str(data.get('text') or ''),
+        'keywords': [str(keyword) for keyword in keywords],
+        'confidence': parse_number(data, 'confidence'),
+        'timestamp': data.get('timestamp') or datetime.now().isoformat(),
+    }
+    
+    with store.audio_lock:
+        audio_entry['seq'] = store.audio_seq + 1
+        store.audio_history.append(audio_entry)
+        store.audio_seq = audio_entry['seq']
+        store.current_audio = audio_entry
+    
+    # Episode-level alerts, debounced by the rule engine
+    raise_alerts(store, 'audio', audio_entry,
+                 f"Keywords Detected: {', '.join(audio_entry['keywords'])}")
+    
+    record_reading(store, 'audio', audio_entry)
+    publish_update(store, 'audio', audio_entry)
+    return audio_entry
 
 @app.route('/api/audio/update', methods=['POST'])
 def update_audio_status():
     """Update audio transcription data (called by monitoring script)"""
-    data = request.get_json()
+    try:
+        audio_entry = ingest_audio(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'status': 'updated', 'data': audio_entry})
+
+# ============================================================================
+# BATCH INGEST ROUTES
+# ============================================================================
+
+INGEST_HANDLERS = {
+    'pain': ingest_pain,
+    'agitation': ingest_agitation,
+    'audio': ingest_audio,
+}
+
+@app.route('/api/ingest/batch', methods=['POST'])
+def ingest_batch():
+    """
+    Ingest a batch of mixed readings in one request (called by monitoring client).
+    Body: {"bed_id": "...", "readings": [{"type": "pain", "data": {...}}, ...]}
+    A reading's own 'bed_id' overrides the batch-level one. Malformed
+    readings are counted in 'rejected'; the rest of the batch is still ingested.
+    """
+    data = request.get_json(silent=True) or {}
+    readings = data.get('readings')
+    if not isinstance(readings, list):
+        return jsonify({'error': "Expected a 'readings' list"}), 400
     
-    with data_store.lock:
-        audio_entry = {
-            'text': data.get('text', ''),
-            'keywords': data.get('keywords', []),
-            'confidence': data.get('confidence'),
-            'timestamp': datetime.now().isoformat(),
-        }
-        
-        data_store.audio_history.append(audio_entry)
-        data_store.current_audio = audio_entry
-        
-        # Create alert if keywords detected
-        if audio_entry['keywords']:
-            alert = {
-                'id': f"audio_{datetime.now().timestamp()}",
-                'type': 'AUDIO',
-                'severity': 'WARNING',
-                'timestamp': datetime.now().isoformat(),
-                'message': f"Keywords Detected: {', '.join(audio_entry['keywords'])}",
-                'data': audio_entry,
-            }
-            data_store.alerts.append(alert)
-            socketio.emit('audio_alert', alert)
+    accepted = {'pain': 0, 'agitation': 0, 'audio': 0}
+    rejected = 0
+    for reading in readings:
+        handler = INGEST_HANDLERS.get(reading.get('type')) if isinstance(reading, dict) else None
+        if handler is None or not isinstance(reading.get('data'), dict):
+            rejected += 1
+            continue
+        if data.get('bed_id') and not reading['data'].get('bed_id'):
+            reading['data']['bed_id'] = data['bed_id']
+        try:
+            handler(reading['data'])
+        except Exception as e:
+            # One bad reading must not fail (and get the client to drop) the whole batch
+            print(f"Rejected {reading['type']} reading: {e}")
+            rejected += 1
+            continue
+        accepted[reading['type']] += 1
     
-    return jsonify({'status': 'updated', 'data': audio_entry})
+    return jsonify({'status': 'updated', 'accepted': accepted, 'rejected': rejected})
 
 # ============================================================================
 # SYSTEM STATUS ROUTES
@@ -215,19 +701,43 @@ def update_audio_status():
 @app.route('/api/system/status', methods=['GET'])
 def get_system_status():
     """Get overall system status"""
-    with data_store.lock:
-        return jsonify({
-            'pain': data_store.current_pain,
-            'agitation': data_store.current_agitation,
-            'audio': data_store.current_audio,
-            'stats': {
-                'total_pain_readings': len(data_store.pain_history),
-                'total_agitation_readings': len(data_store.agitation_history),
-                'total_audio_readings': len(data_store.audio_history),
-                'total_alerts': len(data_store.alerts),
-                'critical_alerts': len([a for a in data_store.alerts if a.get('severity') == 'CRITICAL']),
+    store = find_store()
+    if store is None:
+        return unknown_bed()
+    etag = system_status_etag(store)
+    if not_modified(etag):
+        return etag_response(etag)
+    return cached_response(*system_status_body(store))
+
+@app.route('/api/system/metrics', methods=['GET'])
+def get_system_metrics():
+    """Delivery and cache counters for the backend itself"""
+    return jsonify({
+        'alert_dispatcher': alert_dispatcher.stats(),
+        'live_push': live_publisher.stats(),
+        'response_cache': {store.bed_id: store.cache.stats() for store in beds.all()},
+        'timeseries': timeseries.stats() if timeseries is not None else None,
+        'alert_engine': {
+            store.bed_id: {
+                'suppressed_readings': store.alert_engine.suppressed,
+                'open_episodes': store.alert_engine.open_episodes(),
             }
+            for store in beds.all()
+        },
+    })
+
+@app.route('/api/beds', methods=['GET'])
+def get_beds():
+    """List known beds with their current status"""
+    result = []
+    for store in beds.all():
+        result.append({
+            'bed_id': store.bed_id,
+            'pain': store.current_pain,
+            'agitation': store.current_agitation,
+            'audio': store.current_audio,
         })
+    return jsonify({'beds': result, 'total': len(result)})
 
 # ============================================================================
 # CONTROL ROUTES
@@ -265,13 +775,40 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
+    live_publisher.drop_sid(request.sid)
     print(f"Client disconnected: {request.sid}")
 
 @socketio.on('subscribe_alerts')
-def handle_subscribe():
-    """Subscribe client to alert updates"""
-    join_room('alerts')
-    emit('subscribed', {'data': 'Subscribed to alerts'})
+def handle_subscribe(data=None):
+    """Subscribe client to alerts of one bed ({'bed': id}) or of every bed"""
+    bed_id = (data or {}).get('bed')
+    join_room(f'alerts:{bed_id}' if bed_id else 'alerts')
+    emit('subscribed', {'data': 'Subscribed to alerts', 'bed': bed_id})
+
+@socketio.on('subscribe')
+def handle_subscribe_status(data=None):
+    """
+    Subscribe client to live status pushes.
+    {'bed': id, 'streams': ['pain', ...]} - either key may be omitted;
+    with neither the client gets every bed and stream.
+    """
+    data = data or {}
+    rooms = subscription_rooms(data.get('bed'), data.get('streams'))
+    for room in rooms:
+        join_room(room)
+        live_publisher.add_subscriber(request.sid, room)
+    emit('subscribed', {'data': 'Subscribed to status updates', 'rooms': rooms,
+                        'max_hz': LIVE_PUSH_MAX_HZ})
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe_status(data=None):
+    """Leave the rooms joined by a matching 'subscribe'"""
+    data = data or {}
+    rooms = subscription_rooms(data.get('bed'), data.get('streams'))
+    for room in rooms:
+        leave_room(room)
+        live_publisher.remove_subscriber(request.sid, room)
+    emit('unsubscribed', {'rooms': rooms})
 
 # ============================================================================
 # ERROR HANDLERS
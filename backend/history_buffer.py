@@ -0,0 +1,182 @@
+"""
+Compact ring buffers for reading histories
+Numeric readings are kept column-wise in typed `array`s with float epoch
+timestamps (about 40 bytes per pain or agitation reading instead of a
+dict with an ISO string). Entries are converted back to JSON-ready dicts
+only when a window is served.
+"""
+from array import array
+from collections import deque
+from datetime import datetime
+import math
+
+def to_epoch(timestamp):
+    """ISO timestamp (or None) to float epoch seconds"""
+    if not timestamp:
+        return datetime.now().timestamp()
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return datetime.now().timestamp()
+
+def to_iso(epoch):
+    return datetime.fromtimestamp(epoch).isoformat()
+
+class ReadingBuffer:
+    """
+    Fixed-capacity ring buffer of readings.
+    fields maps field name -> array typecode ('d' floats store None as NaN).
+    Arrays grow on demand up to capacity, then wrap around in place.
+    """
+
+    def __init__(self, capacity, fields):
+        self.capacity = capacity
+        self.fields = dict(fields)
+        self.columns = {name: array(code) for name, code in self.fields.items()}
+        self.seqs = array('q')
+        self.times = array('d')
+        self.status_codes = array('B')
+        self.statuses = []       # code -> status string
+        self.status_index = {}   # status string -> code
+        self.head = 0            # Next slot to overwrite once full
+
+    def __len__(self):
+        return len(self.seqs)
+
+    @property
+    def latest_seq(self):
+        return self.seqs[self.head - 1] if self.seqs else 0
+
+    def _status_code(self, status):
+        code = self.status_index.get(status)
+        if code is None:
+            code = len(self.statuses)
+            if code > 255:
+                raise ValueError(f"more than 256 distinct statuses, cannot store {status!r}")
+            self.statuses.append(status)
+            self.status_index[status] = code
+        return code
+
+    def append(self, entry):
+        """Store an entry dict with 'seq', 'timestamp', 'status' and the fields"""
+        values = []
+        for name, code in self.fields.items():
+            value = entry.get(name)
+            if code == 'd':
+                values.append(math.nan if value is None else float(value))
+            else:
+                value = int(value or 0)
+                bound = 1 << (8 * self.columns[name].itemsize - 1)
+                if not -bound <= value < bound:
+                    raise ValueError(f"'{name}' is out of range")
+                values.append(value)
+        seq = entry['seq']
+        epoch = to_epoch(entry.get('timestamp'))
+        # Everything is converted before any array changes, so a bad entry leaves them aligned
+        status = self._status_code(entry.get('status'))
+
+        if len(self.seqs) < self.capacity:
+            for name, value in zip(self.fields, values):
+                self.columns[name].append(value)
+            self.seqs.append(seq)
+            self.times.append(epoch)
+            self.status_codes.append(status)
+            self.head = len(self.seqs) % self.capacity
+            return
+
+        i = self.head
+        for name, value in zip(self.fields, values):
+            self.columns[name][i] = value
+        self.seqs[i] = seq
+        self.times[i] = epoch
+        self.status_codes[i] = status
+        self.head = (i + 1) % self.capacity
+
+    def entry(self, slot):
+        """JSON-ready dict for a physical slot"""
+        entry = {}
+        for name, code in self.fields.items():
+            value = self.columns[name][slot]
+            entry[name] = None if code == 'd' and math.isnan(value) else value
+        entry['status'] = self.statuses[self.status_codes[slot]]
+        entry['timestamp'] = to_iso(self.times[slot])
+        entry['seq'] = self.seqs[slot]
+        return entry
+
+    def _count(self, limit, since):
+        """
+        Entries in the newest-`limit` window after `since`. Sequence numbers
+        are contiguous, so the cut-off is computed instead of searched for.
+        """
+        count = min(limit, len(self.seqs))
+        if since is not None:
+            count = max(0, min(count, self.latest_seq - since))
+        return count
+
+    def window(self, limit, since=None):
+        """Newest `limit` entries, oldest first, restricted to seq > since when a cursor is given"""
+        size = len(self.seqs)
+        count = self._count(limit, since)
+        start = self.head - count  # Negative indexes wrap to the end of the arrays
+        return [self.entry(i % size) for i in range(start, start + count)]
+
+    def snapshot(self, limit, since=None):
+        """
+        The same window copied into a new buffer with array slices, cheap
+        enough to take under the stream lock; building the dicts with its
+        window() can then happen after the lock is released.
+        """
+        count = self._count(limit, since)
+        copy = ReadingBuffer(max(count, 1), self.fields)
+        if count == 0:
+            return copy
+        start = (self.head - count) % len(self.seqs)
+        end = start + count
+
+        def take(values):
+            if end <= len(values):
+                return values[start:end]
+            return values[start:] + values[:end - len(values)]
+
+        copy.columns = {name: take(column) for name, column in self.columns.items()}
+        copy.seqs = take(self.seqs)
+        copy.times = take(self.times)
+        copy.status_codes = take(self.status_codes)
+        copy.statuses = list(self.statuses)
+        copy.head = 0
+        return copy
+
+    def nbytes(self):
+        """Approximate memory held by the arrays"""
+        arrays = [self.seqs, self.times, self.status_codes, *self.columns.values()]
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+
+class EntryBuffer:
+    """Ring buffer of entry dicts with the same window() API, for free-text streams"""
+
+    def __init__(self, capacity):
+        self.entries = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def latest_seq(self):
+        return self.entries[-1]['seq'] if self.entries else 0
+
+    def append(self, entry):
+        self.entries.append(entry)
+
+    def window(self, limit, since=None):
+        """Same contract as ReadingBuffer.window"""
+        size = len(self.entries)
+        count = min(limit, size)
+        if since is not None:
+            count = max(0, min(count, self.latest_seq - since))
+        return [self.entries[i] for i in range(size - count, size)]
+
+    def snapshot(self, limit, since=None):
+        """Same contract as ReadingBuffer.snapshot"""
+        copy = EntryBuffer(max(limit, 1))
+        copy.entries.extend(self.window(limit, since))
+        return copy
@@ -0,0 +1,126 @@
+"""
+Room-scoped, throttled live status push over Socket.IO
+Status updates are published to rooms and coalesced so each room gets
+at most max_hz emits per second, each carrying the latest value of every
+bed/stream that changed since the previous emit.
+
+Rooms:
+    ward                   every bed, every stream
+    bed:<bed_id>           every stream of one bed
+    bed:<bed_id>:<stream>  one stream of one bed
+    stream:<stream>        one stream across all beds
+"""
+from collections import defaultdict
+import threading
+import time
+
+def status_rooms(bed_id, stream):
+    """Rooms interested in a status update for bed_id/stream"""
+    return ('ward', f'bed:{bed_id}', f'bed:{bed_id}:{stream}', f'stream:{stream}')
+
+def subscription_rooms(bed_id=None, streams=None):
+    """Rooms matching a 'subscribe' request"""
+    if bed_id and streams:
+        return [f'bed:{bed_id}:{stream}' for stream in streams]
+    if bed_id:
+        return [f'bed:{bed_id}']
+    if streams:
+        return [f'stream:{stream}' for stream in streams]
+    return ['ward']
+
+class LivePublisher:
+    """Coalesces status updates per room and emits them at a capped rate"""
+
+    def __init__(self, socketio, max_hz=2.0, event='status_update'):
+        self.socketio = socketio
+        self.interval = 1.0 / max_hz
+        self.event = event
+        self.pending = defaultdict(dict)  # room -> {(bed_id, stream): payload}
+        self.last_sent = {}               # room -> monotonic time of last emit
+        self.subscribers = defaultdict(int)
+        self.sid_rooms = defaultdict(set)
+        self.lock = threading.Lock()
+        self.started = False
+        self.emitted = 0
+        self.coalesced = 0
+
+    # ------------------------------------------------------------------
+    # Subscriptions (called from Socket.IO handlers)
+    # ------------------------------------------------------------------
+    def add_subscriber(self, sid, room):
+        with self.lock:
+            if room not in self.sid_rooms[sid]:
+                self.sid_rooms[sid].add(room)
+                self.subscribers[room] += 1
+
+    def remove_subscriber(self, sid, room):
+        with self.lock:
+            if room in self.sid_rooms.get(sid, ()):
+                self.sid_rooms[sid].discard(room)
+                self._release(room)
+
+    def drop_sid(self, sid):
+        """Forget every room of a disconnected client; returns them"""
+        with self.lock:
+            rooms = self.sid_rooms.pop(sid, set())
+            for room in rooms:
+                self._release(room)
+        return rooms
+
+    def _release(self, room):
+        self.subscribers[room] -= 1
+        if self.subscribers[room] <= 0:
+            del self.subscribers[room]
+            self.pending.pop(room, None)
+            self.last_sent.pop(room, None)
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+    def publish(self, bed_id, stream, payload):
+        """Queue the latest status of bed_id/stream for its subscribed rooms"""
+        update = {'bed_id': bed_id, 'stream': stream, 'data': payload}
+        with self.lock:
+            for room in status_rooms(bed_id, stream):
+                if self.subscribers.get(room):
+                    if (bed_id, stream) in self.pending[room]:
+                        self.coalesced += 1
+                    self.pending[room][(bed_id, stream)] = update
+        self.start()
+
+    def start(self):
+        """Start the flush loop once"""
+        if not self.started:
+            with self.lock:
+                if self.started:
+                    return
+                self.started = True
+            self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        tick = min(self.interval / 4, 0.05)
+        while True:
+            self.socketio.sleep(tick)
+            for room, updates in self._due():
+                self.socketio.emit(self.event, {'updates': updates}, to=room)
+                self.emitted += 1
+
+    def _due(self):
+        """Pop pending updates of rooms whose interval has elapsed"""
+        now = time.monotonic()
+        due = []
+        with self.lock:
+            for room in [r for r, updates in self.pending.items() if updates]:
+                if now - self.last_sent.get(room, 0) >= self.interval:
+                    due.append((room, list(self.pending.pop(room).values())))
+                    self.last_sent[room] = now
+        return due
+
+    def stats(self):
+        with self.lock:
+            return {
+                'max_hz': 1.0 / self.interval,
+                'rooms': len(self.subscribers),
+                'emitted': self.emitted,
+                'coalesced': self.coalesced,
+            }
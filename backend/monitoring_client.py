@@ -3,21 +3,119 @@ Integration module to send monitoring data to Flask backend
 This should be imported by the monitoring scripts
 """
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from datetime import datetime
 import threading
 import queue
+import time
+import os
+
+# Seconds an HTTP request to the backend may take
+REQUEST_TIMEOUT = 5
+
+# Map update endpoints to reading types understood by /api/ingest/batch
+ENDPOINT_TYPES = {
+    'pain/update': 'pain',
+    'agitation/update': 'agitation',
+    'audio/update': 'audio',
+}
+
+class ReportPolicy:
+    """
+    Decides which readings of one stream are worth sending.
+    A reading is sent when its status changes, when a numeric field moved
+    by at least its deadband since the last sent reading, or when nothing
+    was sent for `heartbeat` seconds. At most one reading per
+    `min_interval` seconds goes out, status changes included, so a status
+    flapping between two levels cannot flood the backend; a held-back
+    status change is sent as soon as the interval has passed.
+    """
+    
+    def __init__(self, deadbands=None, min_interval=0.0, heartbeat=5.0):
+        self.deadbands = deadbands or {}  # field -> minimum change (0 = any change)
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.last_sent = None
+        self.last_time = None
+        self.sent = 0
+        self.suppressed = 0
+    
+    def should_send(self, data, now=None):
+        now = time.monotonic() if now is None else now
+        if self._changed(data, now):
+            self.last_sent = dict(data)
+            self.last_time = now
+            self.sent += 1
+            return True
+        self.suppressed += 1
+        return False
+    
+    def _changed(self, data, now):
+        if self.last_sent is None:
+            return True
+        elapsed = now - self.last_time
+        if elapsed < self.min_interval:
+            return False
+        if data.get('status') != self.last_sent.get('status'):
+            return True
+        if self.heartbeat is not None and elapsed >= self.heartbeat:
+            return True
+        for field, deadband in self.deadbands.items():
+            value, last = data.get(field), self.last_sent.get(field)
+            if value is None or last is None:
+                if value is not last:
+                    return True
+            elif abs(value - last) >= deadband and value != last:
+                return True
+        return False
 
 class MonitoringClient:
     """Client for sending monitoring data to Flask backend"""
     
-    def __init__(self, server_url='http://localhost:5000'):
+    def __init__(self, server_url='http://localhost:5000', bed_id=None, max_queue=1000):
         self.server_url = server_url
         self.api_url = f"{server_url}/api"
-        self.data_queue = queue.Queue()
+        self.bed_id = bed_id  # Backend shard for this bed (None = default bed)
+        # Bounded: when the backend is slow or down the oldest readings are dropped
+        self.data_queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
         self.sender_thread = None
         self.running = False
+        self.policies = {}  # Reading type -> ReportPolicy (see set_report_policy)
         
+        # Pooled keep-alive session shared by all requests
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        
+        # Batching mode (see enable_batching)
+        self.batching = False
+        self.batch_size = 50
+        self.batch_max_age = 0.5
+        self.pending = []
+        self.pending_since = None
+    
+    def enable_batching(self, batch_size=50, max_age=0.5):
+        """
+        Coalesce readings and send them to /api/ingest/batch.
+        A batch is flushed when it holds batch_size readings or when its
+        oldest reading is max_age seconds old. Starts the sender thread.
+        """
+        self.batching = True
+        self.batch_size = batch_size
+        self.batch_max_age = max_age
+        self.start()
+    
+    def set_report_policy(self, reading_type, deadbands=None, min_interval=0.0, heartbeat=5.0):
+        """
+        Filter and rate-limit one stream ('pain', 'agitation' or 'audio')
+        with a ReportPolicy. Readings that pass are always queued for the
+        sender thread, so the caller never waits on the network.
+        """
+        self.policies[reading_type] = ReportPolicy(deadbands, min_interval, heartbeat)
+        self.start()
+    
     def start(self):
         """Start background thread for sending data"""
         if not self.running:
@@ -26,25 +124,119 @@ class MonitoringClient:
             self.sender_thread.start()
     
     def stop(self):
-        """Stop background thread"""
+        """
+        Stop the sender thread, which sends whatever is still queued before
+        it exits. Waits for an in-flight request plus the final flush.
+        """
         self.running = False
+        thread = self.sender_thread
+        if thread is None or not thread.is_alive():
+            self._drain()  # No sender thread to do it
+            return
+        thread.join(timeout=2 * REQUEST_TIMEOUT + 1)
+        if thread.is_alive():
+            print("⚠️ Sender thread still busy, readings left in the queue are not sent")
+    
+    def _drain(self):
+        """Send every queued and pending reading (sender thread or stop() only)"""
+        while True:
+            try:
+                endpoint, data = self.data_queue.get_nowait()
+            except queue.Empty:
+                break
+            if self.batching:
+                self._add_to_batch(endpoint, data)
+            else:
+                self._send_data(endpoint, data)
+        self._flush_batch()
     
     def _send_loop(self):
-        """Background loop to send queued data"""
+        """Background loop to send queued data, drained on stop()"""
         while self.running:
             try:
-                endpoint, data = self.data_queue.get(timeout=1)
-                self._send_data(endpoint, data)
+                timeout = self._batch_wait() if self.batching else 1
+                endpoint, data = self.data_queue.get(timeout=timeout)
+                if self.batching:
+                    self._add_to_batch(endpoint, data)
+                else:
+                    self._send_data(endpoint, data)
             except queue.Empty:
-                continue
+                pass
             except Exception as e:
                 print(f"Error sending data: {e}")
+            
+            if self.batching and self._batch_due():
+                self._flush_batch()
+        self._drain()
+    
+    def _batch_wait(self):
+        """Seconds until the pending batch must be flushed"""
+        if self.pending_since is None:
+            return 1
+        return max(0.0, self.batch_max_age - (time.monotonic() - self.pending_since))
+    
+    def _batch_due(self):
+        """True when the pending batch is full or too old"""
+        if not self.pending:
+            return False
+        return (len(self.pending) >= self.batch_size or
+                time.monotonic() - self.pending_since >= self.batch_max_age)
+    
+    def _add_to_batch(self, endpoint, data):
+        """Add a reading to the pending batch"""
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending.append({'type': ENDPOINT_TYPES[endpoint], 'data': data})
+    
+    def _flush_batch(self):
+        """Send all pending readings in one request"""
+        if not self.pending:
+            return
+        readings = self.pending
+        self.pending = []
+        self.pending_since = None
+        try:
+            url = f"{self.api_url}/ingest/batch"
+            response = self.session.post(url, json={'readings': readings}, timeout=REQUEST_TIMEOUT)
+            if response.status_code != 200:
+                print(f"✗ Error sending batch of {len(readings)}: {response.status_code}")
+        except Exception as e:
+            print(f"✗ Connection error: {e}")
+    
+    def _enqueue(self, endpoint, data, async_send):
+        """Queue data for the sender thread or send it right away"""
+        policy = self.policies.get(ENDPOINT_TYPES[endpoint])
+        if policy is not None and not policy.should_send(data):
+            return
+        if self.bed_id is not None:
+            data['bed_id'] = self.bed_id
+        if self.batching:
+            # Keep the sample time, the batch may be sent later
+            data['timestamp'] = datetime.now().isoformat()
+            self._put_nowait((endpoint, data))
+        elif async_send or policy is not None:
+            self._put_nowait((endpoint, data))
+        else:
+            self._send_data(endpoint, data)
+    
+    def _put_nowait(self, item):
+        """Queue without blocking; when full, drop the oldest queued reading"""
+        while True:
+            try:
+                self.data_queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.data_queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
     
     def _send_data(self, endpoint, data):
         """Send data to backend"""
         try:
             url = f"{self.api_url}/{endpoint}"
-            response = requests.post(url, json=data, timeout=5)
+            response = self.session.post(url, json=data, timeout=REQUEST_TIMEOUT)
             if response.status_code == 200:
                 print(f"✓ Data sent to {endpoint}")
             else:
@@ -63,10 +255,7 @@ class MonitoringClient:
             'au10': au10,
         }
         
-        if async_send:
-            self.data_queue.put(('pain/update', data))
-        else:
-            self._send_data('pain/update', data)
+        self._enqueue('pain/update', data, async_send)
     
     # Agitation Monitoring
     def send_agitation_data(self, level, status, head_speed=None, arm_speed=None, async_send=False):
@@ -78,10 +267,7 @@ class MonitoringClient:
             'arm_speed': arm_speed,
         }
         
-        if async_send:
-            self.data_queue.put(('agitation/update', data))
-        else:
-            self._send_data('agitation/update', data)
+        self._enqueue('agitation/update', data, async_send)
     
     # Audio Monitoring
     def send_audio_data(self, text, keywords=None, confidence=None, async_send=False):
@@ -92,26 +278,33 @@ class MonitoringClient:
             'confidence': confidence,
         }
         
-        if async_send:
-            self.data_queue.put(('audio/update', data))
-        else:
-            self._send_data('audio/update', data)
+        self._enqueue('audio/update', data, async_send)
     
     def get_status(self, monitor_type):
         """Get current status from backend"""
         try:
             url = f"{self.api_url}/{monitor_type}/status"
-            response = requests.get(url, timeout=5)
+            params = {'bed': self.bed_id} if self.bed_id is not None else None
+            response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
             return response.json()
         except Exception as e:
             print(f"Error getting status: {e}")
             return None
     
+    def stats(self):
+        """Queue and reporting counters"""
+        return {
+            'queued': self.data_queue.qsize(),
+            'dropped': self.dropped,
+            'policies': {name: {'sent': p.sent, 'suppressed': p.suppressed}
+                         for name, p in self.policies.items()},
+        }
+    
     def health_check(self):
         """Check if backend is running"""
         try:
             url = f"{self.api_url}/health"
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
             return response.status_code == 200
         except:
             return False
@@ -120,10 +313,16 @@ class MonitoringClient:
 _client = None
 
 def get_monitoring_client():
-    """Get or create global monitoring client"""
+    """
+    Get or create global monitoring client.
+    PAIN_WATCHER_SERVER and PAIN_WATCHER_BED_ID select the backend and bed.
+    """
     global _client
     if _client is None:
-        _client = MonitoringClient()
+        _client = MonitoringClient(
+            server_url=os.environ.get('PAIN_WATCHER_SERVER', 'http://localhost:5000'),
+            bed_id=os.environ.get('PAIN_WATCHER_BED_ID'),
+        )
     return _client
 
 def send_pain_alert(score, status, au04=None, au07=None, au10=None):
@@ -0,0 +1,30 @@
+"""
+Encode-once response cache
+Holds pre-serialized JSON bodies keyed by route, each tagged with the
+ETag of the data it was built from. A body is only served while its
+ETag still matches, so a stale entry can never leak out.
+"""
+
+class ResponseCache:
+    """Pre-serialized JSON bodies for one bed"""
+
+    def __init__(self):
+        self.entries = {}  # key -> (etag, body bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, etag):
+        """Cached body for key if it was built for this etag, else None"""
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == etag:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, etag, body):
+        """Store the body built for etag"""
+        self.entries[key] = (etag, body)
+
+    def stats(self):
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,109 @@
+"""
+Multi-resolution rollups
+Each reading updates 1 s, 10 s, 1 min, 5 min, 15 min and 1 h buckets
+(min/max/mean/count) as it arrives, so a long-range chart is served from a
+few hundred pre-aggregated points instead of raw samples.
+"""
+from collections import deque
+from datetime import datetime
+import math
+
+# resolution name -> (bucket width in seconds, buckets kept in memory)
+# Consecutive tiers are at most 6x apart, so 'auto' gives every range
+# longer than a few minutes between MAX_POINTS / 6 and MAX_POINTS points
+TIERS = {
+    '1s': (1, 3600),            # last hour
+    '10s': (10, 6 * 360),       # last 6 hours
+    '1m': (60, 1440),           # last day
+    '5m': (300, 7 * 288),       # last 7 days
+    '15m': (900, 30 * 96),      # last 30 days
+    '1h': (3600, 24 * 90),      # last 90 days
+}
+
+# 'auto' picks the finest tier that keeps a range under this many points
+MAX_POINTS = 1000
+
+def bucket_dict(start, low, high, total, count):
+    return {
+        'timestamp': datetime.fromtimestamp(start).isoformat(),
+        'min': low,
+        'max': high,
+        'mean': total / count,
+        'count': count,
+    }
+
+def choose_resolution(start, end, max_points=MAX_POINTS):
+    """Finest tier that covers [start, end] in at most max_points buckets"""
+    if start is None:
+        return '1s'
+    span = (end if end is not None else datetime.now().timestamp()) - start
+    for name, (width, _) in TIERS.items():
+        if span / width <= max_points:
+            return name
+    return '1h'
+
+class RollupTier:
+    """Ring of fixed-width buckets; the newest bucket stays open for updates"""
+
+    def __init__(self, width, capacity):
+        self.width = width
+        self.buckets = deque(maxlen=capacity)  # [start, min, max, sum, count], oldest first
+        self.late = 0  # Readings older than every bucket kept
+
+    def add(self, epoch, value):
+        start = math.floor(epoch / self.width) * self.width
+        if not self.buckets or start > self.buckets[-1][0]:
+            self.buckets.append([start, value, value, value, 1])
+            return
+        # Same or an earlier bucket (batched readings can arrive out of order)
+        for bucket in reversed(self.buckets):
+            if bucket[0] == start:
+                bucket[1] = min(bucket[1], value)
+                bucket[2] = max(bucket[2], value)
+                bucket[3] += value
+                bucket[4] += 1
+                return
+            if bucket[0] < start:
+                break
+        self.late += 1
+
+    @property
+    def oldest(self):
+        return self.buckets[0][0] if self.buckets else None
+
+    def query(self, start=None, end=None, limit=MAX_POINTS):
+        """Buckets overlapping [start, end], oldest first, newest `limit` kept"""
+        result = []
+        for bucket in reversed(self.buckets):
+            if end is not None and bucket[0] > end:
+                continue
+            if start is not None and bucket[0] + self.width <= start:
+                break
+            result.append(bucket_dict(*bucket))
+            if len(result) >= limit:
+                break
+        result.reverse()
+        return result
+
+class Rollups:
+    """All tiers for one numeric field of a stream"""
+
+    def __init__(self, field):
+        self.field = field
+        self.tiers = {name: RollupTier(width, capacity) for name, (width, capacity) in TIERS.items()}
+
+    def add(self, epoch, entry):
+        value = entry.get(self.field)
+        if value is None:
+            return
+        value = float(value)
+        for tier in self.tiers.values():
+            tier.add(epoch, value)
+
+    def covers(self, resolution, start):
+        """True if the in-memory tier reaches back to start"""
+        tier = self.tiers[resolution]
+        return tier.oldest is not None and (start is None or tier.oldest < start + tier.width)
+
+    def query(self, resolution, start=None, end=None, limit=MAX_POINTS):
+        return self.tiers[resolution].query(start, end, limit)
@@ -0,0 +1,87 @@
+"""
+Tests for the episode rules behind alerts
+Run with: python -m pytest backend
+"""
+from alert_rules import AlertEngine, ThresholdRule, KeywordRule
+
+def agitation_rule():
+    return ThresholdRule('AGITATION', 'level', enter=10, exit=5, critical=20,
+                         min_interval=30, realert_interval=120)
+
+def feed(rule, readings):
+    """Apply (time, entry) readings to one rule; the actions of each reading"""
+    episode, results = None, []
+    for now, entry in readings:
+        episode, actions = rule.evaluate(episode, entry, now)
+        results.append([action for action, _ in actions])
+    return results
+
+def test_episode_opens_above_enter_and_closes_only_at_exit():
+    levels = [8, 11, 9, 6, 5, 7]
+    actions = feed(agitation_rule(), [(t, {'level': level}) for t, level in enumerate(levels)])
+    assert actions == [[], ['open'], [], [], ['close'], []]
+
+def test_open_warning_escalates_to_critical_once():
+    actions = feed(agitation_rule(), [(0, {'level': 12}), (1, {'level': 25}), (2, {'level': 28}), (3, {'level': 15})])
+    assert actions == [['open'], ['escalate'], [], []]
+
+def test_critical_reading_opens_a_critical_episode():
+    episode, actions = agitation_rule().evaluate(None, {'level': 25}, 0)
+    assert actions == [('open', episode)]
+    assert episode.severity == 'CRITICAL'
+
+def test_open_episode_reminds_after_realert_interval():
+    actions = feed(agitation_rule(), [(0, {'level': 12}), (60, {'level': 12}), (120, {'level': 12}), (130, {'level': 12})])
+    assert actions == [['open'], [], ['reminder'], []]
+
+def test_reentry_within_min_interval_reopens_the_same_episode():
+    rule = agitation_rule()
+    first, _ = rule.evaluate(None, {'level': 12}, 0)
+    rule.evaluate(first, {'level': 4}, 10)
+    episode, actions = rule.evaluate(first, {'level': 12}, 20)
+    assert actions == [('reopen', first)]
+    assert episode is first and episode.closed_at is None
+
+def test_debounced_reentry_still_escalates():
+    rule = agitation_rule()
+    first, _ = rule.evaluate(None, {'level': 12}, 0)
+    rule.evaluate(first, {'level': 4}, 10)
+    _, actions = rule.evaluate(first, {'level': 25}, 20)
+    assert [action for action, _ in actions] == ['reopen', 'escalate']
+
+def test_reentry_after_min_interval_opens_a_new_episode():
+    rule = agitation_rule()
+    first, _ = rule.evaluate(None, {'level': 12}, 0)
+    rule.evaluate(first, {'level': 4}, 10)
+    episode, actions = rule.evaluate(first, {'level': 12}, 50)
+    assert actions == [('open', episode)]
+    assert episode is not first
+
+def test_enter_condition_gates_new_episodes():
+    rule = ThresholdRule('PAIN', 'score', enter=1.5, exit=1.0, critical=3,
+                         enter_condition=lambda entry: entry['status'] == 'PAIN DETECTED')
+    actions = feed(rule, [(0, {'score': 2.0, 'status': 'COMFORT'}), (1, {'score': 2.0, 'status': 'PAIN DETECTED'})])
+    assert actions == [[], ['open']]
+
+def test_keyword_repeats_are_suppressed_and_new_keywords_realert():
+    rule = KeywordRule(episode_gap=60, escalate_count=5)
+    actions = feed(rule, [(0, {'keywords': ['pain']}), (10, {'keywords': ['pain']}),
+                          (20, {'keywords': ['nurse']}), (30, {'keywords': []})])
+    assert actions == [['open'], [], ['reminder'], []]
+
+def test_keyword_episode_escalates_on_count_or_critical_keyword():
+    rule = KeywordRule(episode_gap=60, escalate_count=3, critical_keywords=('help',))
+    assert feed(rule, [(t, {'keywords': ['pain']}) for t in (0, 10, 20)]) == [['open'], [], ['escalate']]
+    assert feed(rule, [(0, {'keywords': ['pain']}), (10, {'keywords': ['help']})]) == [['open'], ['escalate']]
+
+def test_keyword_episode_closes_after_gap():
+    rule = KeywordRule(episode_gap=60)
+    actions = feed(rule, [(0, {'keywords': ['pain']}), (100, {'keywords': ['pain']})])
+    assert actions == [['open'], ['close', 'open']]
+
+def test_engine_counts_suppressed_readings_of_open_episodes():
+    engine = AlertEngine({'agitation': agitation_rule()})
+    for now, level in enumerate([12, 13, 14, 4]):
+        engine.evaluate('agitation', {'level': level}, now)
+    assert engine.suppressed == 2
+    assert engine.open_episodes() == []
@@ -0,0 +1,56 @@
+"""
+Tests for the indexed alert store
+Run with: python -m pytest backend
+"""
+from alert_store import AlertStore
+
+def alert(n, severity='WARNING', alert_type='PAIN'):
+    return {'id': f'a{n}', 'severity': severity, 'type': alert_type,
+            'timestamp': f'2026-01-01T00:00:{n:02d}'}
+
+def test_counts_follow_eviction():
+    store = AlertStore(max_size=3)
+    for n, severity in enumerate(['CRITICAL', 'CRITICAL', 'WARNING', 'WARNING', 'WARNING']):
+        store.add(alert(n, severity))
+    assert len(store) == 3
+    assert store.count(severity='CRITICAL') == 0
+    assert store.count(severity='WARNING') == 3
+    assert store.count(acked=False) == 3
+    assert store.stats()['by_severity'] == {'WARNING': 3}
+
+def test_acknowledge_moves_alert_between_indexes():
+    store = AlertStore()
+    for n in range(3):
+        store.add(alert(n))
+    acked = store.acknowledge('a1', by='nurse')
+    assert acked['acknowledged'] and acked['acknowledged_by'] == 'nurse'
+    assert store.count(acked=True) == 1
+    assert [a['id'] for a in store.query(acked=False)] == ['a0', 'a2']
+    assert store.acknowledge('missing') is None
+
+def test_evicted_acknowledged_alert_leaves_no_count_behind():
+    store = AlertStore(max_size=2)
+    store.add(alert(0))
+    store.acknowledge('a0')
+    store.add(alert(1))
+    store.add(alert(2))
+    assert store.count(acked=True) == 0
+    assert store.count(acked=False) == 2
+
+def test_query_filters_oldest_first_with_limit_and_since():
+    store = AlertStore()
+    for n in range(6):
+        store.add(alert(n, 'CRITICAL' if n % 2 else 'WARNING', 'AUDIO' if n >= 3 else 'PAIN'))
+    assert [a['id'] for a in store.query(severity='CRITICAL')] == ['a1', 'a3', 'a5']
+    assert [a['id'] for a in store.query(severity='CRITICAL', alert_type='AUDIO')] == ['a3', 'a5']
+    assert [a['id'] for a in store.query(limit=2)] == ['a4', 'a5']
+    assert [a['id'] for a in store.query(since='2026-01-01T00:00:03')] == ['a4', 'a5']
+    assert store.count(severity='CRITICAL', alert_type='PAIN') == 1
+
+def test_readding_an_id_replaces_it():
+    store = AlertStore()
+    store.add(alert(0, 'WARNING'))
+    store.add(alert(0, 'CRITICAL'))
+    assert len(store) == 1
+    assert store.count(severity='WARNING') == 0
+    assert store.count(severity='CRITICAL') == 1
@@ -0,0 +1,52 @@
+"""
+Tests for the monitor-side report policy and sender thread
+Run with: python -m pytest backend
+"""
+import time
+from monitoring_client import MonitoringClient, ReportPolicy
+
+def test_flapping_status_is_rate_limited():
+    """WARNING/CALM flipping on every frame at 30 fps goes out at most every min_interval"""
+    policy = ReportPolicy(deadbands={'level': 1}, min_interval=0.2, heartbeat=2.0)
+    sent = []
+    for i in range(300):
+        now = i / 30
+        status = "WARNING" if i % 2 else "CALM"
+        if policy.should_send({'level': 10 + i % 2, 'status': status}, now=now):
+            sent.append(now)
+    assert len(sent) <= 10 * 5 + 1
+    assert all(b - a >= 0.2 - 1e-9 for a, b in zip(sent, sent[1:]))
+
+def test_held_back_status_change_is_sent_after_interval():
+    policy = ReportPolicy(min_interval=0.2, heartbeat=None)
+    assert policy.should_send({'status': "CALM"}, now=0.0)
+    assert not policy.should_send({'status': "CRITICAL"}, now=0.1)
+    assert policy.should_send({'status': "CRITICAL"}, now=0.2)
+    assert not policy.should_send({'status': "CRITICAL"}, now=0.5)
+
+def test_stop_sends_readings_still_queued():
+    client = MonitoringClient()
+    client.batching = True  # Sender thread never started: readings stay queued
+    posted = []
+    client.session.post = lambda url, json, timeout: posted.append(json) or type('R', (), {'status_code': 200})()
+    for level in range(3):
+        client.send_agitation_data(level, "CALM")
+    client.stop()
+    assert [r['data']['level'] for r in posted[0]['readings']] == [0, 1, 2]
+    assert client.data_queue.empty()
+
+def test_stop_waits_for_the_sender_thread_to_drain():
+    client = MonitoringClient()
+    posted = []
+    def slow_post(url, json, timeout):
+        time.sleep(0.2)  # Still in flight when stop() is called
+        posted.append(json)
+        return type('R', (), {'status_code': 200})()
+    client.session.post = slow_post
+    client.enable_batching(batch_size=2, max_age=0.5)
+    for level in range(5):
+        client.send_agitation_data(level, "CALM")
+    time.sleep(0.05)
+    client.stop()
+    assert not client.sender_thread.is_alive()
+    assert sorted(r['data']['level'] for batch in posted for r in batch['readings']) == [0, 1, 2, 3, 4]
@@ -0,0 +1,173 @@
+"""
+Persistent time-series storage
+Append-only SQLite store (WAL mode) for every reading. Ingest only puts
+rows on a queue; a writer thread commits them in batches, so disk I/O
+never adds latency to the ingest path. Rows are clustered by
+(bed_id, stream, ts), so a time-range query only reads the pages that
+cover the requested range. With a retention window, the writer thread
+periodically deletes rows older than it (through an index on ts).
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    bed_id TEXT NOT NULL,
+    stream TEXT NOT NULL,
+    ts REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (bed_id, stream, ts, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS readings_ts ON readings (ts)
+"""
+
+class TimeSeriesStore:
+    """Batched writer plus range reader over one SQLite database"""
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_pending=100000,
+                 retention=None, prune_interval=600):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention = retention            # Seconds of readings kept (None = forever)
+        self.prune_interval = prune_interval  # Seconds between retention deletes
+        self.last_prune = None
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.local = threading.local()
+        self.running = False
+        self.writer = None
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.pruned = 0
+
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connect(self):
+        """Connection for the calling thread (SQLite connections are per thread)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def start(self):
+        """Start the writer thread"""
+        if not self.running:
+            self.running = True
+            self.writer = threading.Thread(target=self._write_loop, daemon=True)
+            self.writer.start()
+
+    def stop(self):
+        """Stop the writer thread after flushing queued rows"""
+        self.running = False
+        if self.writer is not None:
+            self.writer.join(timeout=5)
+
+    def append(self, bed_id, stream, seq, epoch, entry):
+        """Queue one reading for writing; never blocks"""
+        try:
+            self.pending.put_nowait((bed_id, stream, epoch, seq, json.dumps(entry)))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        conn = self._connect()
+        while self.running or not self.pending.empty():
+            rows = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._prune_if_due(conn)
+            if not rows:
+                continue
+            try:
+                with conn:
+                    conn.executemany('INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?, ?)', rows)
+                self.written += len(rows)
+                self.batches += 1
+            except sqlite3.Error as e:
+                print(f"Error writing readings: {e}")
+                self.dropped += len(rows)
+
+    def _prune_if_due(self, conn):
+        """Delete readings older than the retention window, every prune_interval seconds"""
+        if self.retention is None:
+            return
+        now = time.monotonic()
+        if self.last_prune is not None and now - self.last_prune < self.prune_interval:
+            return
+        self.last_prune = now
+        try:
+            with conn:
+                deleted = conn.execute('DELETE FROM readings WHERE ts < ?',
+                                       (time.time() - self.retention,)).rowcount
+            self.pruned += deleted
+        except sqlite3.Error as e:
+            print(f"Error pruning readings: {e}")
+
+    def query(self, bed_id, stream, start=None, end=None, limit=10000):
+        """
+        Entries of one bed and stream with start <= ts <= end (epoch seconds,
+        either bound optional), oldest first, at most `limit` rows.
+        """
+        sql = 'SELECT data FROM readings WHERE bed_id = ? AND stream = ?'
+        params = [bed_id, stream]
+        if start is not None:
+            sql += ' AND ts >= ?'
+            params.append(start)
+        if end is not None:
+            sql += ' AND ts <= ?'
+            params.append(end)
+        sql += ' ORDER BY ts, seq LIMIT ?'
+        params.append(limit)
+        rows = self._connect().execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def rollup(self, bed_id, stream, field, width, start=None, end=None, limit=500):
+        """
+        min/max/mean/count of a numeric entry field in buckets of `width`
+        seconds, oldest first, newest `limit` buckets kept. Used when the
+        range reaches past what the in-memory rollups hold.
+        """
+        sql = ('SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, MIN(v), MAX(v), SUM(v), COUNT(v) '
+               'FROM (SELECT ts, json_extract(data, ?) AS v FROM readings '
+               'WHERE bed_id = ? AND stream = ?')
+        params = [width, width, f'$.{field}', bed_id, stream]
+        if start is not None:
+            sql += ' AND ts >= ?'
+            params.append(start)
+        if end is not None:
+            sql += ' AND ts <= ?'
+            params.append(end)
+        sql += ') WHERE v IS NOT NULL GROUP BY bucket ORDER BY bucket DESC LIMIT ?'
+        params.append(limit)
+        rows = self._connect().execute(sql, params).fetchall()
+        rows.reverse()
+        return rows
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'pending': self.pending.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'pruned': self.pruned,
+            'retention': self.retention,
+        }
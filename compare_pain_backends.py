@@ -0,0 +1,94 @@
+"""
+Compare the CPU-optimized pain inference path against the py-feat baseline
+Runs the same frames through retinaface + py-feat (baseline) and through
+YuNet + int8 py-feat landmarks, both with the same pinned CPU thread
+count, then reports speed and how far the pain scores drift apart.
+
+Usage: python compare_pain_backends.py [video_file_or_camera_index] [frames] [cpu_threads]
+"""
+import os
+import sys
+import time
+import warnings
+import cv2
+import numpy as np
+from feat import Detector
+warnings.filterwarnings('ignore')  # Suppress FutureWarnings
+
+from pain_inference import AUExtractor, pain_score, configure_cpu, make_face_detector, quantize_landmarks
+
+PAIN_THRESHOLD = 1.5  # Same as pain_monitor.py
+YUNET_MODEL = os.environ.get("PAIN_WATCHER_YUNET_MODEL", "models/face_detection_yunet_2023mar.onnx")
+
+source = sys.argv[1] if len(sys.argv) > 1 else "0"
+frame_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+cpu_threads = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+
+def run(name, extractor):
+    """Pain score (or None) and latency in ms for every frame"""
+    extractor.extract(frames[0])  # Warm-up, not timed
+    scores, latencies = [], []
+    for frame in frames:
+        started = time.perf_counter()
+        aus = extractor.extract(frame)
+        latencies.append((time.perf_counter() - started) * 1000)
+        scores.append(None if aus is None else pain_score(aus))
+    latencies = np.array(latencies)
+    found = sum(score is not None for score in scores)
+    print(f"\n{name}")
+    print(f"   Latency: mean {latencies.mean():.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms "
+          f"({1000 / latencies.mean():.1f} frames/s)")
+    print(f"   Faces found: {found}/{len(frames)}")
+    return scores, latencies
+
+print("=" * 70)
+print("PAIN INFERENCE BACKEND COMPARISON")
+print("=" * 70)
+
+# Read the frames once so both paths see exactly the same input
+cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+frames = []
+while len(frames) < frame_limit:
+    ret, frame = cap.read()
+    if not ret:
+        break
+    frames.append(frame)
+cap.release()
+if not frames:
+    print("✗ Could not read any frames")
+    sys.exit(1)
+print(f"Frames: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]}) from {source}")
+
+# Same thread count for both paths, so the speed-up is the backends' alone
+threads = configure_cpu(cpu_threads)
+print(f"CPU threads: {threads}")
+face_detector = make_face_detector("cpu", YUNET_MODEL)
+if face_detector is None:
+    print("\n✗ YuNet model missing, set PAIN_WATCHER_YUNET_MODEL to face_detection_yunet_2023mar.onnx")
+    sys.exit(1)
+detector = Detector(au_model="svm", emotion_model="resmasknet", face_model="retinaface", device="cpu")
+
+baseline_scores, baseline_ms = run("Baseline: retinaface + py-feat",
+                                   AUExtractor(detector, output_size=320))
+
+landmarks = "int8" if quantize_landmarks(detector) else "float"
+fast_scores, fast_ms = run(f"CPU path: YuNet + py-feat ({landmarks} landmarks)",
+                           AUExtractor(detector, output_size=320, face_detector=face_detector))
+
+# Accuracy loss, on frames where both paths found a face
+pairs = np.array([(a, b) for a, b in zip(baseline_scores, fast_scores) if a is not None and b is not None])
+missed = sum(a is not None and b is None for a, b in zip(baseline_scores, fast_scores))
+extra = sum(a is None and b is not None for a, b in zip(baseline_scores, fast_scores))
+
+print("\nAgreement")
+print(f"   Speed-up: {baseline_ms.mean() / fast_ms.mean():.2f}x")
+print(f"   Face detection: {missed} frames missed, {extra} extra vs baseline")
+if len(pairs):
+    error = np.abs(pairs[:, 0] - pairs[:, 1])
+    status_match = np.mean((pairs[:, 0] > PAIN_THRESHOLD) == (pairs[:, 1] > PAIN_THRESHOLD))
+    print(f"   Pain score error: mean {error.mean():.3f}, max {error.max():.3f} ({len(pairs)} frames)")
+    if len(pairs) > 1 and pairs[:, 0].std() > 0 and pairs[:, 1].std() > 0:
+        print(f"   Correlation: {np.corrcoef(pairs[:, 0], pairs[:, 1])[0, 1]:.3f}")
+    print(f"   Same PAIN/COMFORT status: {status_match * 100:.1f}%")
+else:
+    print("   No frame with a face in both paths")
@@ -0,0 +1,222 @@
+"""
+Shared-memory camera frame bus
+One publisher process owns the camera, decodes each frame once and writes
+it into a small ring of frame slots in shared memory, stamped with a
+sequence number. Monitors on the same machine subscribe with
+FrameSubscriber, a drop-in for cv2.VideoCapture whose read() returns the
+newest frame they have not seen yet, each at its own rate.
+
+    python frame_bus.py --camera 0          # publisher
+    PAIN_WATCHER_FRAME_BUS=1 python pain_monitor.py
+    PAIN_WATCHER_FRAME_BUS=1 python full_agitation_monitor.py
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+BUS_NAME = "pain_watcher_frames"
+
+# Header fields (int64)
+SEQ, HEIGHT, WIDTH, CHANNELS, SLOTS, CLOSED = range(6)
+HEADER_FIELDS = 8
+
+def _layout(shape, slots):
+    """Byte offsets of slot sequence numbers, slot timestamps and frames, and the total size"""
+    seqs = HEADER_FIELDS * 8
+    times = seqs + slots * 8
+    frames = times + slots * 8
+    return seqs, times, frames, frames + slots * int(np.prod(shape))
+
+class _Ring:
+    """numpy views over the shared block"""
+
+    def __init__(self, shm, shape, slots):
+        seqs, times, frames, _ = _layout(shape, slots)
+        self.header = np.ndarray((HEADER_FIELDS,), np.int64, shm.buf, 0)
+        self.seqs = np.ndarray((slots,), np.int64, shm.buf, seqs)
+        self.times = np.ndarray((slots,), np.float64, shm.buf, times)
+        self.frames = np.ndarray((slots,) + tuple(shape), np.uint8, shm.buf, frames)
+
+    def release(self):
+        # Views must be gone before the block can be closed
+        self.header = self.seqs = self.times = self.frames = None
+
+class FramePublisher:
+    """
+    Writes frames into the shared ring. A slot's sequence number is set to
+    -1 while it is being written and to the frame's number afterwards;
+    the bus sequence number is advanced last, so readers only ever see
+    complete frames.
+    """
+
+    def __init__(self, shape, name=BUS_NAME, slots=4):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = _layout(self.shape, slots)[3]
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left over from a publisher that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.ring = _Ring(self.shm, self.shape, slots)
+        self.ring.header[:] = 0
+        self.ring.header[[HEIGHT, WIDTH, CHANNELS, SLOTS]] = (*self.shape, slots)
+        self.ring.seqs[:] = 0
+        self.seq = 0
+
+    def publish(self, frame, t=None):
+        if frame.shape != self.shape:
+            raise ValueError(f"frame shape {frame.shape} does not match the bus ({self.shape})")
+        seq = self.seq + 1
+        slot = seq % self.slots
+        self.ring.seqs[slot] = -1
+        self.ring.frames[slot] = frame
+        self.ring.times[slot] = time.time() if t is None else t
+        self.ring.seqs[slot] = seq
+        self.ring.header[SEQ] = seq
+        self.seq = seq
+
+    def close(self):
+        """Tell subscribers the stream has ended and remove the block"""
+        self.ring.header[CLOSED] = 1
+        self.ring.release()
+        self.shm.close()
+        self.shm.unlink()
+
+def _attach(name):
+    """Open an existing block without letting this process's resource tracker unlink it at exit"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+class FrameSubscriber:
+    """
+    cv2.VideoCapture-compatible reader of the frame bus.
+    read() waits for a frame newer than the last one returned (frames that
+    came and went in between are skipped, counted in `skipped`) and returns
+    (True, frame), or (False, None) once the publisher has closed the bus
+    or no frame arrived within `timeout` seconds. The frame is copied out of
+    its slot, because callers draw on it and the slot is reused; `latest()`
+    returns a read-only view instead for consumers that finish with it
+    before `slots` more frames are published.
+    """
+
+    def __init__(self, name=BUS_NAME, timeout=5.0, poll=0.002):
+        self.timeout = timeout
+        self.poll = poll
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.shm = _attach(name)
+                break
+            except FileNotFoundError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"no frame bus '{name}' (is frame_bus.py running?)")
+                time.sleep(0.1)
+        header = np.ndarray((HEADER_FIELDS,), np.int64, self.shm.buf, 0)
+        self.shape = (int(header[HEIGHT]), int(header[WIDTH]), int(header[CHANNELS]))
+        self.slots = int(header[SLOTS])
+        del header
+        self.ring = _Ring(self.shm, self.shape, self.slots)
+        self.seq = int(self.ring.header[SEQ])  # Only frames published after subscribing
+        self.last_time = None  # Publisher timestamp of the last frame returned
+        self.skipped = 0
+
+    def isOpened(self):
+        return self.ring is not None and not self.ring.header[CLOSED]
+
+    def _wait_newer(self):
+        """Newest sequence number after self.seq, or None on close/timeout"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            seq = int(self.ring.header[SEQ])
+            if seq > self.seq:
+                return seq
+            if self.ring.header[CLOSED] or time.monotonic() > deadline:
+                return None
+            time.sleep(self.poll)
+
+    def latest(self, copy=True):
+        """(frame, seq, timestamp) of the newest unseen frame, or (None, seq, None)"""
+        if self.ring is None:
+            return None, self.seq, None
+        while True:
+            seq = self._wait_newer()
+            if seq is None:
+                return None, self.seq, None
+            slot = seq % self.slots
+            frame = self.ring.frames[slot]
+            if copy:
+                frame = frame.copy()
+            else:
+                frame = frame.view()
+                frame.flags.writeable = False
+            t = float(self.ring.times[slot])
+            if self.ring.seqs[slot] != seq:
+                continue  # Overwritten while reading: take the next newest
+            self.skipped += seq - self.seq - 1
+            self.seq = seq
+            self.last_time = t
+            return frame, seq, t
+
+    def read(self):
+        frame, _, _ = self.latest()
+        return frame is not None, frame
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.release()
+            self.ring = None
+            self.shm.close()
+
+def open_camera(index=0):
+    """
+    The frame bus when PAIN_WATCHER_FRAME_BUS is set (to 1 for the default
+    bus, or to a bus name), else the camera itself
+    """
+    bus = os.environ.get("PAIN_WATCHER_FRAME_BUS")
+    if bus:
+        print("✓ Reading frames from the shared frame bus")
+        return FrameSubscriber(BUS_NAME if bus == "1" else bus)
+    import cv2
+    return cv2.VideoCapture(index)
+
+def main():
+    import cv2
+    parser = argparse.ArgumentParser(description="Publish camera frames to the shared-memory frame bus")
+    parser.add_argument("--camera", default="0", help="camera index or video file")
+    parser.add_argument("--name", default=BUS_NAME, help="shared memory block name")
+    parser.add_argument("--slots", type=int, default=4, help="frames held in the ring")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(int(args.camera) if args.camera.isdigit() else args.camera)
+    ret, frame = cap.read()
+    if not ret:
+        print("Camera error: no frame.")
+        return
+    publisher = FramePublisher(frame.shape, name=args.name, slots=args.slots)
+    print(f"✓ Publishing {frame.shape[1]}x{frame.shape[0]} frames on '{args.name}'. Press Ctrl+C to stop.")
+    start = time.time()
+    try:
+        while ret:
+            publisher.publish(frame)
+            ret, frame = cap.read()
+        print("End of video or camera error.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.time() - start
+        print(f"Published {publisher.seq} frames ({publisher.seq / max(elapsed, 1e-6):.1f} fps)")
+        publisher.close()
+        cap.release()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Capture / inference / display pipeline helpers
+A capture thread keeps only the newest camera frame, an inference worker
+always picks up the newest frame it has not seen yet (latest-frame-wins),
+and the display loop draws whatever result is current without ever
+waiting for inference.
+"""
+import threading
+import time
+import traceback
+
+class LatestSlot:
+    """Thread-safe slot holding only the most recent item and its sequence number"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.item = None
+        self.seq = 0
+
+    def put(self, item):
+        with self.cond:
+            self.item = item
+            self.seq += 1
+            self.cond.notify_all()
+
+    def get(self):
+        """Current (item, seq) without waiting"""
+        with self.cond:
+            return self.item, self.seq
+
+    def wait_newer(self, seq, timeout=None):
+        """Wait for an item newer than seq; returns (item, seq), item is None on timeout"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > seq, timeout=timeout):
+                return None, seq
+            return self.item, self.seq
+
+class CaptureThread(threading.Thread):
+    """Reads frames continuously and publishes the newest one"""
+
+    def __init__(self, cap):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.frames = LatestSlot()
+        self.running = True
+        self.ended = threading.Event()
+
+    def run(self):
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            self.frames.put((frame, time.time()))
+        self.ended.set()
+
+    def stop(self):
+        self.running = False
+
+class InferenceWorker(threading.Thread):
+    """
+    Runs process(frame) back-to-back on the newest unseen frame.
+    Frames that arrive while a call is running are skipped, not queued.
+    With batch_size > 1, process receives a list of that many newest frames
+    instead, taken at least sample_interval seconds apart.
+    """
+
+    def __init__(self, frames, process, min_interval=0.0, batch_size=1, sample_interval=0.0):
+        super().__init__(daemon=True)
+        self.frames = frames
+        self.process = process
+        self.min_interval = min_interval
+        self.batch_size = batch_size
+        self.sample_interval = sample_interval
+        self.results = LatestSlot()
+        self.running = True
+        self.latency = 0.0  # Seconds from capture (of the oldest frame) to result of the last run
+        self.seen = 0
+
+    def _collect(self):
+        """Next batch_size frames as (frames, oldest capture time), or None when stopped"""
+        batch = []
+        while len(batch) < self.batch_size:
+            item, self.seen = self.frames.wait_newer(self.seen, timeout=0.5)
+            if not self.running:
+                return None
+            if item is None:
+                continue
+            if batch and item[1] - batch[-1][1] < self.sample_interval:
+                continue
+            batch.append(item)
+        return [frame for frame, _ in batch], batch[0][1]
+
+    def run(self):
+        while self.running:
+            started = time.monotonic()
+            collected = self._collect()
+            if collected is None:
+                break
+            frames, captured_at = collected
+            try:
+                self.results.put(self.process(frames if self.batch_size > 1 else frames[0]))
+            except Exception as e:
+                print(f"Error during inference: {e}")
+                traceback.print_exc()
+            self.latency = time.time() - captured_at
+            remaining = self.min_interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def stop(self):
+        self.running = False
@@ -4,8 +4,21 @@ import { toast } from 'react-toastify';
 let socket = null;
 
 const SOCKET_URL = process.env.REACT_APP_SOCKET_URL || 'http://localhost:5000';
+const BED_ID = process.env.REACT_APP_BED_ID || 'default';
 
-export const setupAlertListener = (callback) => {
+const handleAlert = (alert, callback) => {
+  // Backend already sends complete alert object
+  callback(alert);
+  if (alert.type === 'PAIN' && alert.data && alert.data.score > 3) {
+    toast.error(`🚨 PAIN ALERT: ${alert.data.score.toFixed(2)}`);
+  } else if (alert.type === 'AGITATION' && alert.data && alert.data.level > 15) {
+    toast.error(`🚨 AGITATION ALERT: Level ${alert.data.level}`);
+  } else if (alert.type === 'AUDIO' && alert.data && alert.data.keywords && alert.data.keywords.length > 0) {
+    toast.warning(`🔊 Keywords: ${alert.data.keywords.join(', ')}`);
+  }
+};
+
+export const setupAlertListener = (callback, onStatusUpdate) => {
   if (socket) return;
 
   socket = io(SOCKET_URL, {
@@ -18,30 +31,23 @@ export const setupAlertListener = (callback) => {
   socket.on('connect', () => {
     console.log('✓ Connected to monitoring server');
     toast.success('Connected to monitoring system');
-  });
-
-  socket.on('pain_alert', (alert) => {
-    // Backend already sends complete alert object
-    callback(alert);
-    if (alert.data && alert.data.score > 3) {
-      toast.error(`🚨 PAIN ALERT: ${alert.data.score.toFixed(2)}`);
+    // Rooms are per connection, so (re)join them on every connect
+    socket.emit('subscribe_alerts', { bed: BED_ID });
+    if (onStatusUpdate) {
+      socket.emit('subscribe', { bed: BED_ID });
     }
   });
 
-  socket.on('agitation_alert', (alert) => {
-    // Backend already sends complete alert object
-    callback(alert);
-    if (alert.data && alert.data.level > 15) {
-      toast.error(`🚨 AGITATION ALERT: Level ${alert.data.level}`);
+  socket.on('status_update', ({ updates }) => {
+    // Server coalesces updates, each entry is the latest value of one stream
+    if (onStatusUpdate) {
+      updates.forEach(onStatusUpdate);
     }
   });
 
-  socket.on('audio_alert', (alert) => {
-    // Backend already sends complete alert object
-    callback(alert);
-    if (alert.data && alert.data.keywords && alert.data.keywords.length > 0) {
-      toast.warning(`🔊 Keywords: ${alert.data.keywords.join(', ')}`);
-    }
+  socket.on('alert_batch', ({ alerts }) => {
+    // Server batches alerts, handle them one by one in arrival order
+    alerts.forEach((alert) => handleAlert(alert, callback));
   });
 
   socket.on('disconnect', () => {
@@ -64,14 +64,14 @@ const useMonitoringStore = create((set, get) => ({
     set({ isListening: true });
     setupAlertListener((alert) => {
       get().addAlert(alert);
-      
-      // Route to appropriate handler based on type
-      if (alert.type === 'PAIN') {
-        get().setPainData(alert.data);
-      } else if (alert.type === 'AGITATION') {
-        get().setAgitationData(alert.data);
-      } else if (alert.type === 'AUDIO') {
-        get().setAudioData(alert.data);
+    }, (update) => {
+      // Live status pushed by the server, replaces REST polling
+      if (update.stream === 'pain') {
+        get().setPainData(update.data);
+      } else if (update.stream === 'agitation') {
+        get().setAgitationData(update.data);
+      } else if (update.stream === 'audio') {
+        get().setAudioData(update.data);
       }
     });
   },
@@ -1,15 +1,27 @@
 import cv2
 import mediapipe as mp
-import math
 import time
 import sys
 
+from pose_kinematics import PoseKinematics, landmarks_to_array
+from motion_gate import MotionGate
+from frame_bus import open_camera
+
 # Backend Integration
 sys.path.insert(0, './backend')
 from monitoring_client import get_monitoring_client
 
 monitoring_client = get_monitoring_client()
-monitoring_client.start()
+# Coalesce per-frame readings into /api/ingest/batch requests
+monitoring_client.enable_batching(batch_size=30, max_age=0.5)
+# Report on status changes, level/speed changes beyond a deadband, at most
+# 5 per second, and at least every 2 s; never blocks the capture loop
+monitoring_client.set_report_policy(
+    'agitation',
+    deadbands={'level': 1, 'head_speed': 0.2, 'arm_speed': 0.2},
+    min_interval=0.2,
+    heartbeat=2.0
+)
 print("✓ Connected to dashboard backend")
 
 # ---------------------------------------------------------
@@ -22,13 +34,22 @@ pose = mp_pose.Pose(
 )
 mp_drawing = mp.solutions.drawing_utils
 
-# Use '0' for Webcam, or put 'path/to/video.mp4' to test with a file
-cap = cv2.VideoCapture(0)
+# Use '0' for Webcam, or put 'path/to/video.mp4' to test with a file.
+# PAIN_WATCHER_FRAME_BUS=1 shares the camera with pain_monitor.py via frame_bus.py
+cap = open_camera(0)
 
 # --- SENSITIVITY SETTINGS (Tweak these!) ---
-# How much movement is considered "Fast"? (0.02 = 2% of screen distance)
-HEAD_THRESH = 0.02
-ARM_THRESH  = 0.035 
+# How much movement is considered "Fast"? In screen fractions per second
+# (0.6 = 60% of the screen per second, the old 2% per frame at 30 fps)
+HEAD_THRESH = 0.6
+ARM_THRESH  = 1.05
+BODY_THRESH = 0.3       # Mean speed of all visible joints (restless whole body)
+
+# Motion gate: pose runs on every frame only while the picture changes
+MOTION_THRESH = 0.004       # Fraction of changed thumbnail pixels that counts as motion
+MOTION_HOLD = 2.0           # Seconds of full-rate pose after the last motion
+IDLE_POSE_INTERVAL = 1.0    # Seconds between pose runs while the scene is static
+MOTION_AGITATION_THRESH = 0.05  # Fallback: motion energy that counts as agitation when no pose is found
 
 # Alert Logic
 AGITATION_LIMIT = 20    # How many "bad frames" before Red Alert
@@ -36,18 +57,23 @@ COOLDOWN_RATE = 1       # How fast the meter drops when still
 agitation_counter = 0
 
 # State Variables
-prev_landmarks = {} # Stores x,y for nose, wrists
-prev_time = time.time()
+kinematics = PoseKinematics() # Recent positions of all 33 landmarks
+gate = MotionGate(threshold=MOTION_THRESH, hold=MOTION_HOLD, idle_interval=IDLE_POSE_INTERVAL)
+last_pose_landmarks = None    # Drawn on frames where pose is skipped
 
 print("Full-Body Agitation Monitor Active. Press 'q' to quit.")
 
 # ---------------------------------------------------------
 # 2. HELPER FUNCTION
 # ---------------------------------------------------------
-def calculate_movement(curr, prev):
-    """Returns Euclidean distance between two (x,y) points"""
-    if prev is None: return 0.0
-    return math.sqrt((curr[0] - prev[0])**2 + (curr[1] - prev[1])**2)
+def report_agitation(head_speed, arm_speed):
+    """Send the current level to the Dashboard Backend"""
+    monitoring_client.send_agitation_data(
+        level=int(agitation_counter),
+        status="CRITICAL" if agitation_counter >= AGITATION_LIMIT else "WARNING" if agitation_counter > AGITATION_LIMIT/2 else "CALM",
+        head_speed=float(head_speed),
+        arm_speed=float(arm_speed)
+    )
 
 # ---------------------------------------------------------
 # 3. MAIN LOOP
@@ -57,10 +83,15 @@ while True:
     if not ret:
         print("End of video or camera error.")
         break
+    frame_time = time.time()
 
-    # MediaPipe needs RGB
-    image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(image_rgb)
+    # Skip pose while the scene is static (checked on a thumbnail)
+    run_pose = gate.update(frame, frame_time)
+    results = None
+    if run_pose:
+        # MediaPipe needs RGB
+        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = pose.process(image_rgb)
 
     status_text = "Calm"
     status_color = (0, 255, 0) # Green
@@ -68,40 +99,33 @@ while True:
     # Debug values to show on screen
     head_speed = 0.0
     arm_speed = 0.0
+    arm_jerk = 0.0
 
-    if results.pose_landmarks:
+    if results is not None and results.pose_landmarks:
         lm = results.pose_landmarks.landmark
+        last_pose_landmarks = results.pose_landmarks
         
         # -------------------------------------------------
-        # A. GET COORDINATES (Nose + Wrists)
+        # A. KINEMATICS (All 33 joints, one vectorized step)
         # -------------------------------------------------
-        # Indices: Nose=0, Left Wrist=15, Right Wrist=16
-        curr_nose  = (lm[0].x, lm[0].y)
-        curr_lwrist = (lm[15].x, lm[15].y)
-        curr_rwrist = (lm[16].x, lm[16].y)
-
-        # -------------------------------------------------
-        # B. CALCULATE SPEEDS
-        # -------------------------------------------------
-        # Retrieve previous positions (if they exist)
-        prev_nose = prev_landmarks.get('nose')
-        prev_lwrist = prev_landmarks.get('lwrist')
-        prev_rwrist = prev_landmarks.get('rwrist')
-
-        if prev_nose and prev_lwrist and prev_rwrist:
-            # 1. Head Movement
-            head_speed = calculate_movement(curr_nose, prev_nose)
-            
-            # 2. Arm Movement (Max of left or right arm)
-            l_speed = calculate_movement(curr_lwrist, prev_lwrist)
-            r_speed = calculate_movement(curr_rwrist, prev_rwrist)
-            arm_speed = max(l_speed, r_speed)
+        positions, visibility = landmarks_to_array(lm)
+        motion = kinematics.update(positions, visibility, frame_time)
+
+        if kinematics.count >= 2:
+            # -------------------------------------------------
+            # B. SPEEDS (per second, independent of frame rate)
+            # -------------------------------------------------
+            head_speed = motion['head_speed']  # Nose
+            arm_speed = motion['arm_speed']    # Faster wrist
+            arm_jerk = motion['arm_jerk']
+            body_speed = motion['body_speed']
 
             # ---------------------------------------------
             # C. DECISION LOGIC (The "Brain")
             # ---------------------------------------------
             is_moving_head = head_speed > HEAD_THRESH
             is_moving_arms = arm_speed > ARM_THRESH
+            is_moving_body = body_speed > BODY_THRESH
             
             # Weighted Logic: Arm movement is more dangerous (counts double)
             if is_moving_arms:
@@ -110,6 +134,9 @@ while True:
             elif is_moving_head:
                 agitation_counter += 1
                 cv2.putText(frame, "Head Toss", (50, 430), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,165,255), 2)
+            elif is_moving_body:
+                agitation_counter += 1
+                cv2.putText(frame, "Restless", (50, 430), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,165,255), 2)
             else:
                 # Cool down if still
                 if agitation_counter > 0:
@@ -117,23 +144,24 @@ while True:
 
             # Clamp counter
             agitation_counter = max(0, min(agitation_counter, AGITATION_LIMIT + 10))
-            
-            # Send to Dashboard Backend (every 5 frames)
-            if results.pose_landmarks:
-                monitoring_client.send_agitation_data(
-                    level=int(agitation_counter),
-                    status="CRITICAL" if agitation_counter >= AGITATION_LIMIT else "WARNING" if agitation_counter > AGITATION_LIMIT/2 else "CALM",
-                    head_speed=float(head_speed),
-                    arm_speed=float(arm_speed)
-                )
-
-        # Update History
-        prev_landmarks['nose'] = curr_nose
-        prev_landmarks['lwrist'] = curr_lwrist
-        prev_landmarks['rwrist'] = curr_rwrist
 
         # Draw Skeleton
         mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+    else:
+        # No pose this frame: skipped because the scene is static, or not found
+        if run_pose and gate.energy > MOTION_AGITATION_THRESH:
+            # Fallback signal: lots of movement but no skeleton (covered, out of frame)
+            agitation_counter = min(agitation_counter + 1, AGITATION_LIMIT + 10)
+            cv2.putText(frame, "Movement (no pose)", (50, 430), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,165,255), 2)
+        elif gate.energy <= MOTION_THRESH and agitation_counter > 0:
+            # Cool down if still
+            agitation_counter = max(0, agitation_counter - COOLDOWN_RATE)
+        if results is None and last_pose_landmarks is not None:
+            mp_drawing.draw_landmarks(frame, last_pose_landmarks, mp_pose.POSE_CONNECTIONS)
+
+    # Send to Dashboard Backend on every frame, idle ones included: the
+    # report policy drops what did not change and keeps the 2 s heartbeat
+    report_agitation(head_speed, arm_speed)
 
     # -----------------------------------------------------
     # 4. ALERTS & UI
@@ -153,13 +181,20 @@ while True:
     cv2.putText(frame, info, (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,0), 2)
     
     # Debug Stats (Bottom Left)
-    stats = f"Head Spd: {head_speed:.3f} | Arm Spd: {arm_speed:.3f}"
+    stats = f"Head Spd: {head_speed:.2f}/s | Arm Spd: {arm_speed:.2f}/s | Arm Jerk: {arm_jerk:.0f}/s3"
     cv2.putText(frame, stats, (10, 470), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255,255,255), 1)
+    motion_info = f"Motion: {gate.energy:.3f}" + ("" if run_pose else " (pose idle)")
+    cv2.putText(frame, motion_info, (10, 450), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255,255,255), 1)
 
     cv2.imshow('ICU Full Body Watcher', frame)
 
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
+gate_stats = gate.stats()
+print(f"Pose ran on {gate_stats['pose_runs']}/{gate_stats['frames']} frames")
+monitoring_client.stop()
+print(f"Reporting: {monitoring_client.stats()}")
+
 cap.release()
 cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+Keyword matching and the two-stage spotting cascade for the audio monitor
+KeywordMatcher matches whole words (and phrases) against a configurable
+vocabulary. Only longer keywords get a small edit-distance allowance for
+ASR misspellings, so "paint" is not "pain" and "helpful" is not "help".
+KeywordCascade screens every utterance with a cheap transcriber and runs
+the full transcriber only on keyword hits (or every Nth utterance).
+"""
+import json
+import re
+
+WORD_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of two words, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def max_typos(word):
+    """Edits allowed for a keyword: none up to 5 letters, 1 up to 8, then 2"""
+    if len(word) <= 5:
+        return 0
+    return 1 if len(word) <= 8 else 2
+
+def load_vocabulary(path):
+    """Keyword vocabulary from a JSON file: a list of keywords or {keyword: [forms]}"""
+    with open(path) as f:
+        return json.load(f)
+
+class KeywordMatcher:
+    """
+    vocabulary is a list of keywords or a dict of keyword -> accepted forms
+    (e.g. {"hurt": ["hurt", "hurts", "hurting"]}); forms may be phrases
+    ("can't breathe"). find() returns the keywords whose forms occur in a
+    text as whole words. Listed forms must match exactly; only a one-word
+    keyword itself may match fuzzily, keeping its first letter.
+    """
+
+    def __init__(self, vocabulary):
+        if not isinstance(vocabulary, dict):
+            vocabulary = {keyword: [keyword] for keyword in vocabulary}
+        self.keywords = list(vocabulary)
+        self.forms = []  # (keyword, form tokens, typos allowed)
+        for keyword, forms in vocabulary.items():
+            for form in forms or [keyword]:
+                tokens = WORD_RE.findall(form.lower())
+                typos = max_typos(tokens[0]) if tokens == [keyword.lower()] else 0
+                self.forms.append((keyword, tokens, typos))
+
+    def _word_matches(self, word, form_word, typos):
+        if word == form_word:
+            return True
+        return typos > 0 and word[0] == form_word[0] and edit_distance(word, form_word, typos) <= typos
+
+    def find(self, text):
+        """Keywords found in text, in vocabulary order"""
+        words = [w[:-2] if w.endswith("'s") else w for w in WORD_RE.findall(text.lower())]
+        found = set()
+        for keyword, tokens, typos in self.forms:
+            if keyword in found or not tokens:
+                continue
+            for i in range(len(words) - len(tokens) + 1):
+                if all(self._word_matches(words[i + k], token, typos) for k, token in enumerate(tokens)):
+                    found.add(keyword)
+                    break
+        return [keyword for keyword in self.keywords if keyword in found]
+
+class KeywordCascade:
+    """
+    Stage 1: spot(audios) -> texts, a cheap transcription matched for keywords.
+    Stage 2: transcribe(audios) -> texts, the full transcription, run on
+    utterances where stage 1 hit a keyword (to confirm it) and on every
+    full_every-th utterance otherwise (to keep the transcript history
+    useful). Both stages take a list so a batch of utterances is decoded
+    together.
+    """
+
+    def __init__(self, spot, transcribe, matcher, full_every=5):
+        self.spot = spot
+        self.transcribe = transcribe
+        self.matcher = matcher
+        self.full_every = full_every
+        self.utterances = 0
+        self.spotted = 0
+        self.full_runs = 0
+
+    def process(self, audio):
+        """(text, keywords, stage) for one utterance; stage is 1 or 2"""
+        return self.process_batch([audio])[0]
+
+    def process_batch(self, audios):
+        """(text, keywords, stage) for each utterance of a batch"""
+        results = []
+        full = []  # Indexes that need stage 2
+        for audio, text in zip(audios, self.spot(audios)):
+            self.utterances += 1
+            text = text.strip().lower()
+            if self.matcher.find(text):
+                self.spotted += 1
+                full.append(len(results))
+            elif self.full_every and self.utterances % self.full_every == 0:
+                full.append(len(results))
+            results.append((text, [], 1))
+        if full:
+            self.full_runs += len(full)
+            texts = self.transcribe([audios[i] for i in full])
+            for i, text in zip(full, texts):
+                text = text.strip().lower()
+                results[i] = (text, self.matcher.find(text), 2)
+        return results
+
+    def stats(self):
+        return {
+            'utterances': self.utterances,
+            'spotted': self.spotted,
+            'full_runs': self.full_runs,
+        }
@@ -0,0 +1,58 @@
+"""
+Motion gate for the agitation monitor
+Differences each frame against the previous one at thumbnail size and
+measures motion energy. Pose estimation runs on every frame while there
+is motion (and for `hold` seconds after it), but only every
+`idle_interval` seconds while the scene is static.
+"""
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Frame-difference motion energy plus the run / skip decision for pose"""
+
+    def __init__(self, threshold=0.004, hold=2.0, idle_interval=1.0, size=(80, 60), pixel_delta=12):
+        self.threshold = threshold          # Energy that counts as motion
+        self.hold = hold                    # Seconds of full rate after the last motion
+        self.idle_interval = idle_interval  # Seconds between pose runs while static
+        self.size = size
+        self.pixel_delta = pixel_delta      # Grey levels a pixel must change by to count
+        self.previous = None
+        self.last_motion = None
+        self.last_run = None
+        self.energy = 0.0
+
+        self.frames = 0
+        self.runs = 0
+
+    def measure(self, frame):
+        """Fraction of thumbnail pixels that changed since the previous frame (0..1)"""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self.previous is None:
+            self.previous = gray
+            return 0.0
+        changed = cv2.absdiff(gray, self.previous) > self.pixel_delta
+        self.previous = gray
+        return float(np.count_nonzero(changed)) / changed.size
+
+    def update(self, frame, now):
+        """Measure motion on a BGR frame; True if pose should run on it"""
+        self.frames += 1
+        self.energy = self.measure(frame)
+        if self.energy > self.threshold:
+            self.last_motion = now
+        active = self.last_motion is not None and now - self.last_motion <= self.hold
+        run = active or self.last_run is None or now - self.last_run >= self.idle_interval
+        if run:
+            self.last_run = now
+            self.runs += 1
+        return run
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'pose_runs': self.runs,
+            'skipped': self.frames - self.runs,
+            'energy': self.energy,
+        }
@@ -0,0 +1,334 @@
+"""
+In-memory Action Unit extraction for the pain monitor
+Passes frames straight from OpenCV to py-feat's face, landmark and AU
+models instead of writing them to a JPEG and reading them back with
+detect_image. Falls back to the file-based path on py-feat versions
+without the per-stage detector API. With tracking on, the face detector
+only runs periodically; in between, the face box is followed by template
+matching and only landmarks and AUs are computed, on a crop around it.
+Batches of frames can be scored together and aggregated into one
+windowed pain score.
+
+On CPU-only machines the face detector (retinaface, the most expensive
+stage) can be swapped for OpenCV's YuNet ONNX model via cv2.FaceDetectorYN,
+and py-feat's landmark net for a dynamically quantized int8 copy; the AU
+SVM still comes from py-feat.
+"""
+import os
+import tempfile
+import cv2
+import numpy as np
+import torch
+
+# The "grimace" muscles used for the pain score
+PAIN_AUS = ("AU04", "AU07", "AU10")  # Brow Lowerer, Lid Tightener, Upper Lip Raiser
+
+def pain_score(aus):
+    """Pain score from a dict of AU intensities: AU04 + AU07 + AU10"""
+    return sum(float(aus[au]) for au in PAIN_AUS)
+
+def aggregate(values, method="trimmed_mean", trim=0.2, peak_quantile=0.9):
+    """
+    Combine per-frame values over a window.
+    mean, median, trimmed_mean (drops the top and bottom `trim` fraction)
+    or peak (the `peak_quantile` quantile, robust to single-frame spikes).
+    """
+    values = np.sort(np.asarray(values, dtype=float))
+    if method == "mean":
+        return float(values.mean())
+    if method == "median":
+        return float(np.median(values))
+    if method == "trimmed_mean":
+        cut = int(len(values) * trim)
+        if len(values) - 2 * cut > 0:
+            values = values[cut:len(values) - cut]
+        return float(values.mean())
+    if method == "peak":
+        return float(np.quantile(values, peak_quantile))
+    raise ValueError(f"Unknown aggregation: {method}")
+
+def aggregate_aus(au_frames, method="trimmed_mean"):
+    """
+    Window result for a list of AU dicts (None for frames without a face):
+    (pain score, {AU: value}, faces found), or None if no frame had a face.
+    The score aggregates per-frame pain scores; each AU is aggregated alone.
+    """
+    au_frames = [aus for aus in au_frames if aus is not None]
+    if not au_frames:
+        return None
+    score = aggregate([pain_score(aus) for aus in au_frames], method)
+    aus = {au: aggregate([frame_aus[au] for frame_aus in au_frames], method) for au in PAIN_AUS}
+    return score, aus, len(au_frames)
+
+def resize_frame(frame, output_size=320):
+    """Scale a frame so its longest side is output_size (like detect_image's output_size)"""
+    h, w = frame.shape[:2]
+    scale = output_size / max(h, w)
+    if scale == 1:
+        return frame
+    return cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+def frames_to_tensor(frames):
+    """Stack equally sized BGR frames into an RGB float tensor of shape (N, 3, H, W)"""
+    rgb = np.stack([cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames])
+    return torch.from_numpy(rgb).permute(0, 3, 1, 2).float()
+
+class FaceTracker:
+    """
+    Follows the face box between face detections by matching a grayscale
+    template of the detected face (normalized cross-correlation, well
+    under a millisecond per frame) inside a search window around the
+    last box. The match score is the tracking confidence: below min_score
+    (the patient turned away, was covered or left the window) the track is
+    dropped and the next frame goes back to the face detector, as it does
+    every redetect_every tracked frames.
+    """
+
+    def __init__(self, redetect_every=15, min_score=0.6, template_width=48):
+        self.redetect_every = redetect_every
+        self.min_score = min_score
+        self.template_width = template_width  # Template and search window are scaled to this face width
+        self.face_box = None       # Frame coordinates
+        self.template = None
+        self.scale = 1.0
+        self.score = None          # Match score of the last tracked frame
+        self.since_detection = 0
+        self.detections = 0
+        self.tracked = 0
+        self.lost = 0
+
+    @property
+    def needs_detection(self):
+        return self.face_box is None or self.since_detection >= self.redetect_every
+
+    def reset(self, face_box, frame):
+        """Start tracking from a face detector box in a BGR frame"""
+        h, w = frame.shape[:2]
+        x1, y1 = np.maximum(np.asarray(face_box[:2], dtype=float), 0).astype(int)
+        x2, y2 = np.minimum(np.asarray(face_box[2:4], dtype=float), [w, h]).astype(int)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            self.lose()
+            return
+        self.scale = self.template_width / (x2 - x1)
+        gray = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        self.template = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        self.face_box = np.array([x1, y1, x2, y2], dtype=float)
+        self.since_detection = 0
+        self.detections += 1
+
+    def lose(self):
+        self.face_box = None
+        self.template = None
+        self.lost += 1
+
+    def track(self, frame, window):
+        """
+        Face box of a BGR frame found inside window ([x1, y1, x2, y2]),
+        or None with tracking dropped
+        """
+        x1, y1, x2, y2 = window
+        gray = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        search = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        th, tw = self.template.shape
+        if search.shape[0] < th or search.shape[1] < tw:
+            self.lose()
+            return None
+        _, score, _, (dx, dy) = cv2.minMaxLoc(cv2.matchTemplate(search, self.template, cv2.TM_CCOEFF_NORMED))
+        if score < self.min_score:
+            self.lose()
+            return None
+        size = self.face_box[2:] - self.face_box[:2]
+        origin = np.array([x1 + dx / self.scale, y1 + dy / self.scale])
+        self.face_box = np.concatenate([origin, origin + size])
+        self.score = float(score)
+        self.since_detection += 1
+        self.tracked += 1
+        return self.face_box
+
+def select_device(preference="auto"):
+    """'cuda' or 'mps' when available for 'auto', else 'cpu'; explicit choices pass through"""
+    if preference != "auto":
+        return preference
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
+def configure_cpu(threads=None):
+    """Pin torch and OpenCV to `threads` threads (None keeps their defaults)"""
+    if threads:
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(threads)
+    return torch.get_num_threads()
+
+class YuNetFaceDetector:
+    """
+    CPU face detector on OpenCV's YuNet ONNX model
+    (face_detection_yunet_2023mar.onnx from the OpenCV model zoo).
+    detect() returns boxes in py-feat's detect_faces format.
+    """
+
+    def __init__(self, model_path, score_threshold=0.8, nms_threshold=0.3, top_k=50):
+        self.model = cv2.FaceDetectorYN.create(model_path, "", (320, 320),
+                                               score_threshold, nms_threshold, top_k)
+        self.input_size = (320, 320)
+
+    def detect(self, frames):
+        """Per frame, a list of [x1, y1, x2, y2, score], best face first"""
+        results = []
+        for frame in frames:
+            h, w = frame.shape[:2]
+            if self.input_size != (w, h):
+                self.model.setInputSize((w, h))
+                self.input_size = (w, h)
+            _, faces = self.model.detect(frame)
+            boxes = []
+            if faces is not None:
+                for face in sorted(faces, key=lambda f: -f[14]):
+                    x, y, fw, fh = (float(v) for v in face[:4])
+                    boxes.append([x, y, x + fw, y + fh, float(face[14])])
+            results.append(boxes)
+        return results
+
+def quantize_landmarks(detector):
+    """
+    Replace py-feat's landmark net with an int8 copy (dynamic quantization
+    of its Linear layers, CPU only). False if the detector has no torch
+    landmark model to quantize.
+    """
+    model = getattr(detector, "landmark_detector", None)
+    if not isinstance(model, torch.nn.Module):
+        print("⚠️ No torch landmark model to quantize, keeping py-feat's")
+        return False
+    detector.landmark_detector = torch.ao.quantization.quantize_dynamic(
+        model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+    return True
+
+def make_face_detector(device, model_path=None):
+    """YuNet on CPU when its model file is present, else None (use py-feat's detector)"""
+    if device != "cpu" or not model_path:
+        return None
+    if not os.path.exists(model_path):
+        print(f"⚠️ YuNet model not found at {model_path}, using py-feat's face detector")
+        return None
+    return YuNetFaceDetector(model_path)
+
+class AUExtractor:
+    """Runs py-feat on BGR frames and returns AU intensities of the first face"""
+
+    def __init__(self, detector, output_size=320, in_memory=True, track=False,
+                 redetect_every=15, min_score=0.6, roi_margin=0.5, roi_size=224,
+                 face_detector=None):
+        self.detector = detector
+        self.face_detector = face_detector  # Optional replacement for detector.detect_faces
+        self.output_size = output_size
+        self.in_memory = in_memory and all(
+            hasattr(detector, name) for name in ("detect_faces", "detect_landmarks", "detect_aus"))
+        self.au_columns = None
+        self.tracker = None
+        self.roi_margin = roi_margin  # Extra context around the face box, as a fraction of its size
+        self.roi_size = roi_size      # Longest side of the crop fed to the landmark and AU models
+        if self.in_memory:
+            self.au_columns = list(detector.info["au_presence_columns"])
+            if track:
+                self.tracker = FaceTracker(redetect_every, min_score)
+        else:
+            fd, self.temp_path = tempfile.mkstemp(suffix=".jpg", prefix="pain_frame_")
+            os.close(fd)
+            print("⚠️ py-feat without per-stage API, falling back to temp-file detection")
+
+    def extract(self, frame):
+        """AU dict for the first face in a BGR frame, or None if no face was found"""
+        if not self.in_memory:
+            return self._extract_from_file(frame)
+        return self.extract_batch([frame])[0]
+
+    def extract_batch(self, frames):
+        """
+        AU dicts (or None) for equally sized BGR frames, with one face
+        detector, landmark and AU call for the whole batch. While a face is
+        tracked, the face detector is skipped and the batch is cropped around it.
+        """
+        if not self.in_memory:
+            return [self._extract_from_file(frame) for frame in frames]
+
+        if self.tracker is not None and not self.tracker.needs_detection:
+            results = self._extract_tracked(frames)
+            if results is not None:
+                return results
+            # Tracking lost: fall through to a full detection of the batch
+        return self._extract_full(frames)
+
+    def _extract_full(self, frames):
+        """Face detector on the whole (downscaled) frames"""
+        small = [resize_frame(frame, self.output_size) for frame in frames]
+        tensor = frames_to_tensor(small)
+        faces = self._detect_faces(small, tensor)
+        found = [i for i, frame_faces in enumerate(faces or []) if frame_faces]
+        results = [None] * len(frames)
+        if not found:
+            return results
+        if len(found) < len(frames):
+            tensor = tensor[found]
+            faces = [faces[i] for i in found]
+        landmarks = self.detector.detect_landmarks(tensor, detected_faces=faces)
+        aus = self.detector.detect_aus(tensor, landmarks)
+        for j, i in enumerate(found):
+            results[i] = dict(zip(self.au_columns, np.asarray(aus[j])[0]))
+        if self.tracker is not None:
+            # Track from the newest frame with a face
+            scale = small[0].shape[1] / frames[0].shape[1]
+            self.tracker.reset(np.asarray(faces[-1][0][:4], dtype=float) / scale, frames[found[-1]])
+        return results
+
+    def _detect_faces(self, images, tensor):
+        """Per image, a list of [x1, y1, x2, y2, score] face boxes"""
+        if self.face_detector is not None:
+            return self.face_detector.detect(images)
+        return self.detector.detect_faces(tensor)
+
+    def _extract_tracked(self, frames):
+        """
+        Landmarks and AUs on crops around the tracked box, one call each for
+        the batch, with the face box of each frame from the tracker instead
+        of the face detector; None if tracking is lost
+        """
+        box = self.tracker.face_box
+        h, w = frames[0].shape[:2]
+        pad = (box[2:] - box[:2]) * self.roi_margin
+        x1, y1 = np.maximum(box[:2] - pad, 0).astype(int)
+        x2, y2 = np.minimum(box[2:] + pad, [w, h]).astype(int)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            self.tracker.lose()
+            return None
+
+        # Same window for every frame, so the crops stack into one tensor
+        origin = np.array([x1, y1, x1, y1], dtype=float)
+        faces = []
+        for frame in frames:
+            face_box = self.tracker.track(frame, (x1, y1, x2, y2))
+            if face_box is None:
+                return None
+            faces.append((face_box - origin, self.tracker.score))
+        crops = [resize_frame(frame[y1:y2, x1:x2], self.roi_size) for frame in frames]
+        scale = crops[0].shape[1] / (x2 - x1)
+        tensor = frames_to_tensor(crops)
+        tracked = [[list(face_box * scale) + [score]] for face_box, score in faces]
+        landmarks = self.detector.detect_landmarks(tensor, detected_faces=tracked)
+        aus = self.detector.detect_aus(tensor, landmarks)
+        return [dict(zip(self.au_columns, np.asarray(frame_aus)[0])) for frame_aus in aus]
+
+    def _extract_from_file(self, frame):
+        """Previous path: JPEG round trip through detect_image"""
+        cv2.imwrite(self.temp_path, frame)
+        detected = self.detector.detect_image(self.temp_path, output_size=self.output_size)
+        if detected is None or len(detected) == 0:
+            return None
+        return {au: detected[au].values[0] for au in PAIN_AUS}
+
+    def close(self):
+        """Remove the fallback temp file, if any"""
+        if not self.in_memory and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
@@ -3,10 +3,14 @@ from feat import Detector
 import pandas as pd
 import warnings
 import traceback
-import os
 import sys
+import os
 warnings.filterwarnings('ignore')  # Suppress FutureWarnings
 
+from pain_inference import AUExtractor, aggregate_aus, select_device, configure_cpu, make_face_detector, quantize_landmarks
+from frame_pipeline import CaptureThread, InferenceWorker
+from frame_bus import open_camera
+
 # Backend Integration
 sys.path.insert(0, './backend')
 from monitoring_client import get_monitoring_client
@@ -15,118 +19,212 @@ monitoring_client = get_monitoring_client()
 monitoring_client.start()
 print("✓ Connected to dashboard backend")
 
+# Face tracking: run the face detector only every REDETECT_EVERY analysed
+# frames and follow the face by template matching in between. Tracking is
+# dropped sooner when the match score falls below TRACK_MIN_SCORE
+TRACK_FACE = True
+REDETECT_EVERY = 15
+TRACK_MIN_SCORE = 0.6
+
+# Device: 'auto' picks cuda (or mps) when available, else cpu.
+# On cpu, torch/OpenCV use CPU_THREADS threads, faces are found with
+# OpenCV's YuNet ONNX model when YUNET_MODEL exists (retinaface otherwise)
+# and landmarks come from an int8 copy of py-feat's net unless INT8_LANDMARKS is off.
+DEVICE = select_device(os.environ.get("PAIN_WATCHER_DEVICE", "auto"))
+CPU_THREADS = int(os.environ.get("PAIN_WATCHER_CPU_THREADS", "0")) or None
+YUNET_MODEL = os.environ.get("PAIN_WATCHER_YUNET_MODEL", "models/face_detection_yunet_2023mar.onnx")
+INT8_LANDMARKS = os.environ.get("PAIN_WATCHER_INT8_LANDMARKS", "1") == "1"
+
 # 1. Initialize the AI "Watcher" (Downloads models on first run)
 # We use 'svm' for speed. If you have a strong GPU, use 'xgb'.
-print("Loading AI Models... (this may take a moment)")
+print(f"Loading AI Models on {DEVICE}... (this may take a moment)")
 try:
+    if DEVICE == "cpu":
+        print(f"CPU threads: {configure_cpu(CPU_THREADS)}")
     detector = Detector(
         au_model = "svm",      # Fast Action Unit detector
         emotion_model = "resmasknet", 
         face_model = "retinaface",
-        device = "cuda"        # Use GPU acceleration
+        device = DEVICE
     )
-    print("Models loaded successfully!")
+    face_detector = make_face_detector(DEVICE, YUNET_MODEL)
+    int8 = DEVICE == "cpu" and INT8_LANDMARKS and quantize_landmarks(detector)
+    print(f"Models loaded successfully! Face detector: {'YuNet' if face_detector else 'retinaface'}"
+          f", landmarks: {'int8' if int8 else 'float'}")
+    # Frames go straight from memory to the models, no temp JPEG.
+    # Between full face detections the face is tracked and only its crop is analysed.
+    au_extractor = AUExtractor(detector, output_size=320, track=TRACK_FACE,
+                               redetect_every=REDETECT_EVERY, min_score=TRACK_MIN_SCORE,
+                               face_detector=face_detector)
 except Exception as e:
     print(f"Error loading models: {e}")
     traceback.print_exc()
     exit(1)
 
-# 2. Setup Webcam (0 is usually the default laptop cam)
-cap = cv2.VideoCapture(0)
+# 2. Setup Webcam (0 is usually the default laptop cam), or share it with the
+# agitation monitor through frame_bus.py (PAIN_WATCHER_FRAME_BUS=1)
+cap = open_camera(0)
 
 # Constants
 PAIN_THRESHOLD = 1.5   # Adjust sensitivity (0.0 to 5.0)
-SKIP_FRAMES = 30       # Process 1 out of every 30 frames for speed (was 5)
+SKIP_FRAMES = 10 if TRACK_FACE else 30  # Serial mode: analyse 1 out of every N frames (tracked crops are cheap)
+PIPELINED = True       # Capture, inference and display on separate threads
+INFERENCE_INTERVAL = 0.0  # Pipelined mode: minimum seconds between inferences (0 = back-to-back)
 
-frame_count = 0
-current_pain_score = 0
-status_color = (0, 255, 0) # Green (Safe)
-status_text = "COMFORT"
-temp_img_path = "temp_frame.jpg"  # Temporary file for py-feat
+# Batched scoring: K analysed frames go through the models in one call and
+# give one pain score aggregated over the window (BATCH_SIZE = 1 scores
+# single frames). While the face is tracked the batch is cropped around it.
+BATCH_SIZE = 8
+AGGREGATION = "trimmed_mean"  # mean, median, trimmed_mean or peak
+BATCH_SAMPLE_INTERVAL = 0.1   # Pipelined mode: minimum seconds between batched frames
 
-print("Watcher Active. Press 'q' to quit.")
+def analyze_frames(frames):
+    """
+    Run AU detection on a window of frames as one batch, report the
+    aggregated pain score and return (status_text, status_color)
+    """
+    # Detect face and action units directly on the BGR frames
+    au_frames = au_extractor.extract_batch(frames)
+    window = aggregate_aus(au_frames, AGGREGATION)
+    
+    print(f"Detection complete. Faces found: {0 if window is None else window[2]}/{len(frames)}")
+    
+    if window is None:
+        print("No face detected in frame")
+        return "No Face Detected", (255, 0, 0) # Blue
+    
+    # Calculate Pain Score
+    # Some models return 0-1, others 0-5. We sum them up per frame, then aggregate.
+    current_pain_score, aus, _ = window
+    
+    # Extract the specific "Grimace" muscles
+    au4  = aus["AU04"] # Brow Lowerer
+    au7  = aus["AU07"] # Lid Tightener
+    au10 = aus["AU10"] # Upper Lip Raiser
+    
+    print(f"AU Values - AU04: {au4:.3f}, AU07: {au7:.3f}, AU10: {au10:.3f}")
+    
+    # Send to Dashboard Backend (queued in pipelined mode so inference never waits on HTTP)
+    monitoring_client.send_pain_data(
+        score=float(current_pain_score),
+        status="PAIN DETECTED" if current_pain_score > PAIN_THRESHOLD else "COMFORT",
+        au04=float(au4),
+        au07=float(au7),
+        au10=float(au10),
+        async_send=PIPELINED
+    )
+    
+    # Decision Logic
+    if current_pain_score > PAIN_THRESHOLD:
+        print(f"⚠️ PAIN DETECTED! Score: {current_pain_score:.2f}")
+        return f"PAIN DETECTED (Score: {current_pain_score:.2f})", (0, 0, 255) # Red (Danger)
+    print(f"✓ Comfortable. Score: {current_pain_score:.2f}")
+    return f"Comfortable (Score: {current_pain_score:.2f})", (0, 255, 0) # Green (Safe)
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+def analyze_or_flag(frames):
+    """analyze_frames for the worker thread: errors show on the status bar"""
+    if not isinstance(frames, list):
+        frames = [frames]
+    try:
+        return analyze_frames(frames)
+    except Exception as e:
+        print(f"Error during detection: {e}")
+        traceback.print_exc()
+        return "Error - Check Console", (200, 200, 0) # Yellow
+
+def draw_status(frame, status_text, status_color):
+    """Visual Feedback: status bar at the top of the video"""
+    cv2.rectangle(frame, (0, 0), (640, 50), status_color, -1)
+    cv2.putText(frame, status_text, (20, 35), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+
+def run_serial():
+    """Original single loop: the video pauses while a detection runs"""
+    frame_count = 0
+    batch = []
+    status_color = (0, 255, 0) # Green (Safe)
+    status_text = "COMFORT"
     
-    frame_count += 1
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        
+        frame_count += 1
+        
+        # AI Processing (Only runs every N frames to keep video smooth);
+        # analysed frames are scored BATCH_SIZE at a time
+        if frame_count % SKIP_FRAMES == 0:
+            batch.append(frame.copy())
+        if len(batch) >= BATCH_SIZE:
+            frames, batch = batch, []
+            try:
+                print(f"Processing frame {frame_count}...")
+                status_text, status_color = analyze_frames(frames)
+            except KeyboardInterrupt:
+                print("\nStopping...")
+                break
+            except Exception as e:
+                print(f"Error during detection: {e}")
+                traceback.print_exc()
+                status_text = "Error - Check Console"
+                status_color = (200, 200, 0) # Yellow
+        
+        draw_status(frame, status_text, status_color)
+        
+        # Show the video
+        cv2.imshow('ICU Pain Watcher', frame)
+        
+        # Press 'q' to exit
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+def run_pipelined():
+    """
+    Capture thread keeps the newest frame, the inference worker runs on the
+    newest frame it has not seen, and this loop only draws the latest result.
+    """
+    capture = CaptureThread(cap)
+    worker = InferenceWorker(capture.frames, analyze_or_flag, min_interval=INFERENCE_INTERVAL,
+                             batch_size=BATCH_SIZE, sample_interval=BATCH_SAMPLE_INTERVAL)
+    capture.start()
+    worker.start()
     
-    # 3. AI Processing (Only runs every N frames to keep video smooth)
-    if frame_count % SKIP_FRAMES == 0:
-        try:
-            print(f"Processing frame {frame_count}...")
-            # Save current frame temporarily
-            cv2.imwrite(temp_img_path, frame)
+    shown = 0
+    try:
+        while not capture.ended.is_set():
+            item, shown = capture.frames.wait_newer(shown, timeout=0.1)
+            if item is None:
+                continue
+            frame = item[0].copy()  # The worker may be reading the original
             
-            # Detect faces and action units - pass file path
-            detected = detector.detect_image(temp_img_path, output_size=320)
+            result, _ = worker.results.get()
+            status_text, status_color = result or ("COMFORT", (0, 255, 0))
+            draw_status(frame, status_text, status_color)
+            cv2.putText(frame, f"Inference lag: {worker.latency * 1000:.0f} ms", (20, 75),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
             
-            print(f"Detection complete. Result: {type(detected)}, Rows: {len(detected) if detected is not None else 0}")
+            cv2.imshow('ICU Pain Watcher', frame)
             
-            if detected is not None and len(detected) > 0:
-                # Extract the specific "Grimace" muscles
-                # Note: Py-Feat returns a DataFrame, we take the first face found
-                au4  = detected["AU04"].values[0] # Brow Lowerer
-                au7  = detected["AU07"].values[0] # Lid Tightener
-                au10 = detected["AU10"].values[0] # Upper Lip Raiser
-                
-                print(f"AU Values - AU04: {au4:.3f}, AU07: {au7:.3f}, AU10: {au10:.3f}")
-                
-                # Calculate Pain Score
-                # Some models return 0-1, others 0-5. We sum them up.
-                current_pain_score = au4 + au7 + au10
-                
-                # Send to Dashboard Backend (every 10 frames)
-                if frame_count % 10 == 0:
-                    monitoring_client.send_pain_data(
-                        score=float(current_pain_score),
-                        status="PAIN DETECTED" if current_pain_score > PAIN_THRESHOLD else "COMFORT",
-                        au04=float(au4),
-                        au07=float(au7),
-                        au10=float(au10)
-                    )
-                
-                # Decision Logic
-                if current_pain_score > PAIN_THRESHOLD:
-                    status_text = f"PAIN DETECTED (Score: {current_pain_score:.2f})"
-                    status_color = (0, 0, 255) # Red (Danger)
-                    print(f"⚠️ PAIN DETECTED! Score: {current_pain_score:.2f}")
-                else:
-                    status_text = f"Comfortable (Score: {current_pain_score:.2f})"
-                    status_color = (0, 255, 0) # Green (Safe)
-                    print(f"✓ Comfortable. Score: {current_pain_score:.2f}")
-            else:
-                status_text = "No Face Detected"
-                status_color = (255, 0, 0) # Blue
-                print("No face detected in frame")
-                
-        except KeyboardInterrupt:
-            print("\nStopping...")
-            break
-        except Exception as e:
-            print(f"Error during detection: {e}")
-            traceback.print_exc()
-            status_text = "Error - Check Console"
-            status_color = (200, 200, 0) # Yellow
-
-    # 4. Visual Feedback (Draw on the video)
-    # Draw a bar at the top
-    cv2.rectangle(frame, (0, 0), (640, 50), status_color, -1)
-    cv2.putText(frame, status_text, (20, 35), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+            # Press 'q' to exit
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        capture.stop()
+        worker.stop()
+        capture.join(timeout=1)
+        worker.join(timeout=5)
 
-    # Show the video
-    cv2.imshow('ICU Pain Watcher', frame)
+print("Watcher Active. Press 'q' to quit.")
 
-    # Press 'q' to exit
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+if PIPELINED:
+    run_pipelined()
+else:
+    run_serial()
 
+monitoring_client.stop()
 cap.release()
 cv2.destroyAllWindows()
-
-# Clean up temp file
-if os.path.exists(temp_img_path):
-    os.remove(temp_img_path)
\ No newline at end of file
+au_extractor.close()
@@ -0,0 +1,105 @@
+"""
+Full-skeleton kinematics for the agitation monitor
+Keeps a ring buffer of all 33 MediaPipe pose landmarks with their
+visibility and timestamps, and computes velocity, acceleration and jerk
+for every joint at once with NumPy finite differences. Derivatives are
+divided by the real time between frames, so speeds are in screen
+fractions per second whatever the frame rate.
+"""
+import numpy as np
+
+NUM_LANDMARKS = 33
+
+# MediaPipe pose landmark indices
+NOSE = 0
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+ARMS = np.array([13, 14, 15, 16])   # Elbows and wrists
+WRISTS = np.array([LEFT_WRIST, RIGHT_WRIST])
+
+def landmarks_to_array(landmarks):
+    """MediaPipe landmark list -> (positions (33, 2), visibility (33,))"""
+    data = np.array([(lm.x, lm.y, lm.visibility) for lm in landmarks], dtype=float)
+    return data[:, :2], data[:, 2]
+
+class PoseKinematics:
+    """
+    Ring buffer of pose frames. update() adds a frame and returns the
+    kinematics of the newest one; joints below min_visibility in any of
+    the frames used report 0. A gap longer than max_gap seconds (pose
+    lost) restarts the buffer instead of producing one huge jump.
+    """
+
+    def __init__(self, capacity=30, min_visibility=0.5, max_gap=0.5):
+        self.capacity = max(capacity, 4)  # Jerk needs four frames
+        self.min_visibility = min_visibility
+        self.max_gap = max_gap
+        self.positions = np.zeros((self.capacity, NUM_LANDMARKS, 2))
+        self.visibility = np.zeros((self.capacity, NUM_LANDMARKS))
+        self.times = np.zeros(self.capacity)
+        self.count = 0  # Frames pushed since the last reset
+
+    def reset(self):
+        self.count = 0
+
+    def _recent(self, n):
+        """Ring indices of the newest n frames, oldest first"""
+        return (self.count - n + np.arange(n)) % self.capacity
+
+    def update(self, positions, visibility, timestamp):
+        """Add one frame ((33, 2) positions, (33,) visibility) and return features()"""
+        if self.count:
+            last = self.times[(self.count - 1) % self.capacity]
+            if timestamp <= last:
+                return self.features()  # Duplicate or out-of-order frame
+            if timestamp - last > self.max_gap:
+                self.reset()
+        slot = self.count % self.capacity
+        self.positions[slot] = positions
+        self.visibility[slot] = visibility
+        self.times[slot] = timestamp
+        self.count += 1
+        return self.features()
+
+    def features(self):
+        """
+        Per-joint speed, accel and jerk magnitudes ((33,) arrays, per
+        second), the visible mask, and summary values for the agitation
+        logic: head_speed (nose), arm_speed (faster wrist), arm_accel,
+        arm_jerk and body_speed (mean over visible joints).
+        """
+        n = min(self.count, 4)
+        idx = self._recent(n)
+        p = self.positions[idx]
+        t = self.times[idx]
+        visible = (self.visibility[idx] >= self.min_visibility).all(axis=0) if n else np.zeros(NUM_LANDMARKS, bool)
+
+        speed = np.zeros(NUM_LANDMARKS)
+        accel = np.zeros(NUM_LANDMARKS)
+        jerk = np.zeros(NUM_LANDMARKS)
+        if n >= 2:
+            v = np.diff(p, axis=0) / np.diff(t)[:, None, None]
+            speed = np.linalg.norm(v[-1], axis=1)
+        if n >= 3:
+            tv = (t[1:] + t[:-1]) / 2  # Velocities sit between frames
+            a = np.diff(v, axis=0) / np.diff(tv)[:, None, None]
+            accel = np.linalg.norm(a[-1], axis=1)
+        if n >= 4:
+            ta = (tv[1:] + tv[:-1]) / 2
+            j = np.diff(a, axis=0) / np.diff(ta)[:, None, None]
+            jerk = np.linalg.norm(j[-1], axis=1)
+
+        speed[~visible] = 0.0
+        accel[~visible] = 0.0
+        jerk[~visible] = 0.0
+        return {
+            'speed': speed,
+            'accel': accel,
+            'jerk': jerk,
+            'visible': visible,
+            'head_speed': float(speed[NOSE]),
+            'arm_speed': float(speed[WRISTS].max()),
+            'arm_accel': float(accel[ARMS].max()),
+            'arm_jerk': float(jerk[ARMS].max()),
+            'body_speed': float(speed[visible].mean()) if visible.any() else 0.0,
+        }
@@ -0,0 +1,37 @@
+"""
+Tests for keyword matching in the audio monitor
+Run with: python -m pytest test_keyword_spotter.py
+"""
+from keyword_spotter import KeywordMatcher
+
+VOCABULARY = {
+    "help": ["help", "help me", "helping"],
+    "pain": ["pain", "pains", "painful"],
+    "breathe": ["breathe", "breath", "breathing", "can't breathe"],
+    "emergency": ["emergency"],
+}
+
+def test_whole_words_only():
+    matcher = KeywordMatcher(VOCABULARY)
+    assert matcher.find("I'll paint the wall") == []
+    assert matcher.find("that was helpful") == []
+    assert matcher.find("the pain is bad") == ["pain"]
+
+def test_listed_forms_and_phrases():
+    matcher = KeywordMatcher(VOCABULARY)
+    assert matcher.find("It's so painful, please help me") == ["help", "pain"]
+    assert matcher.find("I can't breathe") == ["breathe"]
+
+def test_short_keywords_do_not_match_fuzzily():
+    matcher = KeywordMatcher(VOCABULARY)
+    assert matcher.find("a pan on the stove") == []
+    assert matcher.find("yelp") == []
+
+def test_long_keywords_allow_asr_misspellings_with_the_same_first_letter():
+    matcher = KeywordMatcher(VOCABULARY)
+    assert matcher.find("this is an emergancy") == ["emergency"]
+    assert matcher.find("this is a merengue") == []
+
+def test_keyword_list_vocabulary():
+    matcher = KeywordMatcher(["nurse", "doctor"])
+    assert matcher.find("Call the DOCTOR and a nurse!") == ["nurse", "doctor"]
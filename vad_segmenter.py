@@ -0,0 +1,148 @@
+"""
+Streaming voice activity detection for the audio monitor
+Audio is fed block by block. Energy and the adaptive noise floor are
+computed for every 10 ms frame of a block at once, and a start/end state
+machine turns the speech frames into variable-length utterance segments,
+so Whisper only sees actual speech.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+PRE_EMPHASIS = 0.97  # Boost high frequencies (speech is higher frequency)
+
+class VADSegmenter:
+    """
+    feed() takes consecutive blocks of mono float32 audio with the absolute
+    index of their first sample and returns finished utterances as
+    (start, end) absolute sample ranges.
+
+    A frame is speech when its energy exceeds the noise floor times
+    start_ratio (end_ratio once inside an utterance) and min_energy.
+    start_frames speech frames in a row open an utterance (with pre_roll
+    seconds of lead-in); `hangover` seconds without speech close it. The
+    noise floor is the minimum frame energy over the last floor_window
+    seconds (minimum statistics): pauses between words keep it low during
+    speech, and it rises to a new background level within floor_window.
+    """
+
+    def __init__(self, samplerate=16000, frame_ms=10, start_ratio=3.0, end_ratio=2.0,
+                 min_energy=0.005, start_frames=3, hangover=0.5, pre_roll=0.2,
+                 min_speech=0.5, max_segment=15.0, floor_window=3.0):
+        self.frame = int(samplerate * frame_ms / 1000)
+        self.start_ratio = start_ratio
+        self.end_ratio = end_ratio
+        self.min_energy = min_energy
+        self.start_frames = start_frames
+        self.hangover_frames = int(hangover * 1000 / frame_ms)
+        self.pre_roll = int(pre_roll * samplerate)
+        self.min_speech_frames = int(min_speech * 1000 / frame_ms)
+        self.max_segment = int(max_segment * samplerate)
+        # Energies of the previous floor_window frames (inf until filled)
+        self.history = np.full(int(floor_window * 1000 / frame_ms) - 1, np.inf)
+        self.pending = np.zeros(0, dtype=np.float32)  # Samples short of a full frame
+        self.pending_start = None
+        self.last_sample = 0.0  # For pre-emphasis across blocks
+
+        self.in_speech = False
+        self.run = 0             # Consecutive speech frames while waiting to start
+        self.run_start = 0
+        self.segment_start = 0
+        self.last_speech_end = 0
+        self.speech_frames = 0
+        self.silent_frames = 0
+
+        self.block_silent = False  # True if the last fed block held no speech at all
+        self.segments = 0
+        self.discarded = 0
+
+    def frame_energies(self, samples):
+        """RMS energy of every full frame of pre-emphasized samples, as one vector op"""
+        n = len(samples) // self.frame
+        frames = samples[:n * self.frame]
+        emphasized = frames - PRE_EMPHASIS * np.concatenate(([self.last_sample], frames[:-1]))
+        if n:
+            self.last_sample = frames[-1]
+        return np.sqrt(np.mean(emphasized.reshape(n, self.frame) ** 2, axis=1))
+
+    def noise_floors(self, energies):
+        """Noise floor for each frame: minimum energy over the trailing window"""
+        energies = np.concatenate((self.history, energies))
+        floors = sliding_window_view(energies, len(self.history) + 1).min(axis=1)
+        self.history = energies[len(energies) - len(self.history):]
+        return np.maximum(floors, 1e-6)
+
+    def feed(self, samples, start):
+        """Add a block starting at absolute sample `start`; returns finished (start, end) segments"""
+        if len(self.pending) and self.pending_start + len(self.pending) == start:
+            samples = np.concatenate((self.pending, samples))
+            start = self.pending_start
+        energies = self.frame_energies(samples)
+        used = len(energies) * self.frame
+        self.pending = samples[used:]
+        self.pending_start = start + used
+
+        floors = self.noise_floors(energies)
+        self.block_silent = not self.in_speech and len(energies) > 0
+        done = []
+        for k, (energy, floor) in enumerate(zip(energies.tolist(), floors.tolist())):
+            segment = self._step(energy, floor, start + k * self.frame)
+            if segment is not None:
+                done.append(segment)
+        return done
+
+    def _step(self, energy, floor, position):
+        """Advance the state machine by one frame at absolute sample `position`"""
+        ratio = self.end_ratio if self.in_speech else self.start_ratio
+        speech = energy > floor * ratio and energy > self.min_energy
+        frame_end = position + self.frame
+        if speech or self.in_speech:
+            self.block_silent = False
+
+        if not self.in_speech:
+            if not speech:
+                self.run = 0
+                return None
+            if self.run == 0:
+                self.run_start = position
+            self.run += 1
+            if self.run >= self.start_frames:
+                self.in_speech = True
+                self.segment_start = max(0, self.run_start - self.pre_roll)
+                self.last_speech_end = frame_end
+                self.speech_frames = self.run
+                self.silent_frames = 0
+            return None
+
+        if speech:
+            self.speech_frames += 1
+            self.silent_frames = 0
+            self.last_speech_end = frame_end
+        else:
+            self.silent_frames += 1
+
+        if self.silent_frames >= self.hangover_frames:
+            self.in_speech = False
+            self.run = 0
+            return self._emit(self.segment_start, min(frame_end, self.last_speech_end + self.pre_roll))
+        if frame_end - self.segment_start >= self.max_segment:
+            # Very long utterance: cut it here and keep going
+            segment = self._emit(self.segment_start, frame_end)
+            self.segment_start = frame_end
+            self.speech_frames = 0
+            return segment
+        return None
+
+    def _emit(self, start, end):
+        if self.speech_frames < self.min_speech_frames:
+            self.discarded += 1
+            return None
+        self.segments += 1
+        return start, end
+
+    def flush(self):
+        """Close an utterance still in progress (e.g. at shutdown)"""
+        if not self.in_speech:
+            return None
+        self.in_speech = False
+        self.run = 0
+        return self._emit(self.segment_start, self.last_speech_end)